@@ -0,0 +1,192 @@
+AMO_ENCODINGS = ["pairwise", "sequential", "commander", "ladder"]
+COMMANDER_GROUP = 3  # literals under each commander variable
+
+class CNFBuilder:
+    '''
+    Build a CNF formula with named variables, numbered automatically in the order they are
+    first used, and at-most-one / exactly-one constraints in one of AMO_ENCODINGS:
+        pairwise: a binary clause for every pair, n*(n-1)/2 clauses, no new variables
+        sequential: Sinz's sequential counter, 3n-4 clauses and n-1 new variables
+        commander: Klieber and Kwon's commander encoding, pairwise in groups of COMMANDER_GROUP
+            literals, and recursively at most one commander, about 3.5n clauses and n/2 new variables
+        ladder: Gent and Nightingale's ladder encoding, 3n-4 clauses and n-1 new variables
+            for at most one, n more for exactly one instead of the long at least one clause
+    Pairwise is the smallest up to about 5 literals, the others grow linearly.
+
+    Usage:
+        builder = CNFBuilder()
+        builder.exactly_one([builder.var("color", house) for house in range(1, 6)], encoding="ladder")
+        solver = mySATSolver.new_solver(builder.num_vars, builder.clauses)
+    '''
+
+    def __init__(self, encoding="sequential"):
+        '''
+        Args:
+            encoding (string): default encoding of the at-most-one constraints, one of AMO_ENCODINGS
+        '''
+        if encoding not in AMO_ENCODINGS:
+            raise ValueError("'{}' is not a valid encoding in {}.".format(encoding, AMO_ENCODINGS))
+        self.encoding = encoding
+        self.num_vars = 0
+        self.clauses = []  # DIMACS clauses
+        self.names = {}  # name: variable
+        self.var_names = [None]  # name of each variable, None for the auxiliary variables
+
+    def new_var(self, name=None):
+        '''
+        Returns:
+            int: a new variable, auxiliary if it has no name
+        '''
+        self.num_vars += 1
+        self.var_names.append(name)
+        if name is not None:
+            self.names[name] = self.num_vars
+        return self.num_vars
+
+    def var(self, *name):
+        '''
+        Args:
+            name: any hashable values, e.g. var(item, house)
+        Returns:
+            int: the variable of the name, created on first use
+        '''
+        if name not in self.names:
+            return self.new_var(name)
+        return self.names[name]
+
+    def add_clause(self, clause):
+        '''
+        Args:
+            clause ([int]): DIMACS literals
+        '''
+        self.clauses.append(list(clause))
+
+    def implies(self, a, b):
+        '''
+        a -> b
+        '''
+        self.add_clause([-a, b])
+
+    def equivalent(self, a, b):
+        '''
+        a <-> b
+        '''
+        self.add_clause([-a, b])
+        self.add_clause([a, -b])
+
+    def at_least_one(self, literals):
+        self.add_clause(literals)
+
+    def at_most_one(self, literals, encoding=None):
+        '''
+        Args:
+            literals ([int]): DIMACS literals
+            encoding (string): one of AMO_ENCODINGS, default the builder's encoding
+        '''
+        literals = list(literals)
+        encoding = self.encoding if encoding is None else encoding
+        if encoding not in AMO_ENCODINGS:
+            raise ValueError("'{}' is not a valid encoding in {}.".format(encoding, AMO_ENCODINGS))
+        if len(literals) <= 2 or encoding == "pairwise":
+            self.pairwise_amo(literals)
+        elif encoding == "sequential":
+            self.sequential_amo(literals)
+        elif encoding == "commander":
+            self.commander_amo(literals)
+        else:
+            self.ladder(literals, exactly_one=False)
+
+    def exactly_one(self, literals, encoding=None):
+        '''
+        Args:
+            literals ([int]): DIMACS literals
+            encoding (string): one of AMO_ENCODINGS, default the builder's encoding
+        '''
+        literals = list(literals)
+        encoding = self.encoding if encoding is None else encoding
+        if encoding == "ladder" and len(literals) > 2:
+            self.ladder(literals, exactly_one=True)
+        else:
+            self.at_least_one(literals)
+            self.at_most_one(literals, encoding)
+
+    def pairwise_amo(self, literals):
+        for i in range(len(literals)):
+            for j in range(i+1, len(literals)):
+                self.add_clause([-literals[i], -literals[j]])
+
+    def sequential_amo(self, literals):
+        '''
+        s[i] is true if one of literals[0..i] is true, and a literal must be false when an
+        earlier one is true.
+        '''
+        n = len(literals)
+        s = [self.new_var() for i in range(n-1)]
+        self.add_clause([-literals[0], s[0]])
+        for i in range(1, n-1):
+            self.add_clause([-literals[i], s[i]])
+            self.add_clause([-s[i-1], s[i]])
+            self.add_clause([-literals[i], -s[i-1]])
+        self.add_clause([-literals[n-1], -s[n-2]])
+
+    def commander_amo(self, literals):
+        '''
+        Each group of COMMANDER_GROUP literals gets a commander that is true exactly if one
+        of them is true, at most one literal of the group is true, and at most one commander.
+        '''
+        if len(literals) <= COMMANDER_GROUP + 1:
+            self.pairwise_amo(literals)
+            return
+        commanders = []
+        for i in range(0, len(literals), COMMANDER_GROUP):
+            group = literals[i:i+COMMANDER_GROUP]
+            if len(group) == 1:
+                commanders.append(group[0])
+                continue
+            commander = self.new_var()
+            self.pairwise_amo(group)
+            for literal in group:
+                self.implies(literal, commander)
+            self.add_clause([-commander] + group)
+            commanders.append(commander)
+        self.commander_amo(commanders)
+
+    def ladder(self, literals, exactly_one):
+        '''
+        y[i] is true if the true literal is after literals[i], with y[i+1] -> y[i]. Literal i
+        implies y[i-1] and not y[i], and for exactly one the ladder also implies the literal.
+        '''
+        n = len(literals)
+        y = [self.new_var() for i in range(n-1)]
+        for i in range(n-2):
+            self.implies(y[i+1], y[i])
+        self.add_clause([-literals[0], -y[0]])
+        for i in range(1, n-1):
+            self.add_clause([-literals[i], y[i-1]])
+            self.add_clause([-literals[i], -y[i]])
+        self.add_clause([-literals[n-1], y[n-2]])
+        if exactly_one:
+            self.add_clause([y[0], literals[0]])
+            for i in range(1, n-1):
+                self.add_clause([-y[i-1], y[i], literals[i]])
+            self.add_clause([-y[n-2], literals[n-1]])
+
+    def decode(self, model):
+        '''
+        Args:
+            model ([int]): DIMACS literals of a model, e.g. solver.model()
+        Returns:
+            dict: {name: bool} of every named variable, None if model is None
+        '''
+        if model is None:
+            return None
+        true_vars = set(literal for literal in model if literal > 0)
+        return {name: var in true_vars for name, var in self.names.items()}
+
+    def write_dimacs(self, filename):
+        '''
+        Write the formula as a DIMACS cnf file, for other solvers.
+        '''
+        with open(filename, "w") as file:
+            file.write("p cnf {} {}\n".format(self.num_vars, len(self.clauses)))
+            file.writelines(" ".join(map(str, clause)) + " 0\n" for clause in self.clauses)
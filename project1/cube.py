@@ -0,0 +1,236 @@
+import os
+import math
+import time
+import multiprocessing as mp
+import mySATSolver
+from mySATSolver import CONFLICT, SAT, UNSAT, TIMEOUT, decode_literal
+
+LOOKAHEAD_CANDIDATES = 10  # variables with the highest counts that are looked ahead on each split
+
+def lookahead(solver, literal):
+    '''
+    Assign the literal in a new decision level, propagate, and undo it again.
+    Args:
+        solver (CDCLSolver):
+        literal (int): encoded literal
+    Returns:
+        int: number of literals assigned by the lookahead, None on conflict
+    '''
+    trail_size = len(solver.trail)
+    solver.assign_decision_var(literal)
+    conflict = solver.unit_propagation() == CONFLICT
+    assigned = len(solver.trail) - trail_size
+    solver.backtrack(solver.curr_level - 1)
+    if conflict:
+        return None
+    return assigned
+
+def choose_split(solver, scoring):
+    '''
+    Look ahead on both literals of the candidate variables, taken from the counts of the
+    DLCS or two_clause heuristic, and pick the variable whose two sides assign the most.
+    Args:
+        solver (CDCLSolver): propagated, without conflict
+        scoring (string): "DLCS" or "two_clause"
+    Returns:
+        string: "split" with the encoded positive literal to split on, "failed" with an encoded
+            literal that must hold because its negation conflicts, or "refuted" / "leaf" with None
+    '''
+    counts = solver.var_counts(solver.literal_counts(two_clauses_only=scoring == "two_clause"))
+    if len(counts) == 0 and scoring == "two_clause":
+        counts = solver.var_counts(solver.literal_counts())
+    if len(counts) == 0:
+        return "leaf", None
+    best_var, best_score = None, -1
+    for var, _ in counts.most_common(LOOKAHEAD_CANDIDATES):
+        positive = lookahead(solver, 2*var)
+        negative = lookahead(solver, 2*var+1)
+        if positive is None and negative is None:
+            return "refuted", None
+        if positive is None:
+            return "failed", 2*var+1
+        if negative is None:
+            return "failed", 2*var
+        score = positive * negative + positive + negative
+        if score > best_score:
+            best_var, best_score = var, score
+    return "split", 2*best_var
+
+def generate_cubes(solver, depth, scoring="DLCS"):
+    '''
+    Split the formula into cubes by lookahead, to the given depth of splits. A cube is refuted
+    during generation if the lookahead finds a conflict, and is left out.
+    Args:
+        solver (CDCLSolver): with all the clauses added, at level 0
+        depth (int): number of splits on each path, so at most 2**depth cubes
+        scoring (string): "DLCS" or "two_clause"
+    Returns:
+        [[int]]: cubes as lists of DIMACS literals, [] if the formula is UNSAT
+    '''
+    cubes = []
+    if not solver.ok or solver.unit_propagation() == CONFLICT:
+        solver.ok = False
+        return cubes
+
+    def split(cube, depth):
+        level = solver.curr_level
+        while True:
+            if depth == 0 or solver.all_var_assigned():
+                cubes.append([decode_literal(literal) for literal in cube])
+                break
+            action, literal = choose_split(solver, scoring)
+            if action == "refuted":
+                break
+            if action == "leaf":
+                cubes.append([decode_literal(literal) for literal in cube])
+                break
+            if action == "failed":
+                # the other side conflicts, so literal holds in the whole cube
+                cube.append(literal)
+                solver.assign_decision_var(literal)
+                if solver.unit_propagation() == CONFLICT:
+                    break
+                continue
+            for branch in [literal, literal ^ 1]:
+                solver.assign_decision_var(branch)
+                if solver.unit_propagation() != CONFLICT:
+                    split(cube + [branch], depth - 1)
+                solver.backtrack(solver.curr_level - 1)
+            break
+        solver.backtrack(level)
+
+    split([], depth)
+    return cubes
+
+worker_solver = None  # CDCLSolver of the formula in each pool worker
+
+def init_worker(num_vars, clauses, heuristic, restart, timeout, seed):
+    '''
+    Pool initializer: load the formula once per worker, the cubes only add assumptions.
+    '''
+    global worker_solver
+    worker_solver = mySATSolver.CDCLSolver(num_vars, heuristic=heuristic, restart=restart, timeout=timeout, seed=seed)
+    for clause in clauses:
+        worker_solver.add_clause(clause)
+
+def solve_cube(cube):
+    '''
+    Returns:
+        [int]: the cube
+        string: SAT, UNSAT or TIMEOUT
+        [int]: model if SAT
+        dict: stats of the worker's solver so far
+    '''
+    sat_result = worker_solver.solve(assumptions=cube)
+    return cube, sat_result, worker_solver.model(), worker_solver.stats()
+
+class CubeSolver:
+    '''
+    Cube-and-conquer: split the formula into cubes by lookahead, then solve the cubes under
+    assumptions in a pool of worker processes. The first SAT cube stops the search; the
+    formula is UNSAT only when every cube is refuted. Has the same add_clause/solve/model/stats
+    interface as CDCLSolver.
+    '''
+
+    def __init__(self, num_vars=0, num_cubes=None, scoring="DLCS", heuristic="VSIDS", restart="luby", workers=None, timeout=None, seed=None, debug=False):
+        '''
+        Args:
+            num_vars (int):
+            num_cubes (int): number of cubes aimed for, default 4 per worker
+            scoring (string): "DLCS" or "two_clause", counts used to pick the lookahead candidates
+            heuristic (string): heuristic of the solvers of the cubes
+            restart (string): restart strategy of the solvers of the cubes
+            workers (int): number of worker processes, default the number of cpus
+            timeout (float): time limit in seconds of each solve call, default timeout_limit
+            seed (int):
+            debug (bool):
+        '''
+        if scoring not in ["DLCS", "two_clause"]:
+            raise ValueError("'{}' is not a valid cube scoring in {}.".format(scoring, ["DLCS", "two_clause"]))
+        self.num_vars = num_vars
+        self.clauses = []
+        self.workers = os.cpu_count() if workers is None else workers
+        self.num_cubes = 4 * self.workers if num_cubes is None else num_cubes
+        self.scoring = scoring
+        self.heuristic = heuristic
+        self.restart = restart
+        self.timeout = mySATSolver.timeout_limit if timeout is None else timeout
+        self.seed = seed
+        self.debug = debug
+        self.cubes = []
+        self.refuted_count = 0  # cubes refuted by the workers in the last solve call
+        self.model_values = None
+        self.time_taken = 0
+        self.cube_time = 0  # time spent generating the cubes
+
+    def add_clause(self, clause):
+        '''
+        Args:
+            clause ([int]): DIMACS literals
+        '''
+        for literal in clause:
+            self.num_vars = max(self.num_vars, abs(literal))
+        self.clauses.append(list(clause))
+
+    def solve(self):
+        '''
+        Returns:
+            string: SAT, UNSAT or TIMEOUT
+        '''
+        start_time = time.time()
+        self.model_values = None
+        self.refuted_count = 0
+        cube_solver = mySATSolver.CDCLSolver(self.num_vars, heuristic=self.scoring, seed=self.seed)
+        for clause in self.clauses:
+            cube_solver.add_clause(clause)
+        depth = max(0, math.ceil(math.log2(self.num_cubes)))
+        self.cubes = generate_cubes(cube_solver, depth, self.scoring)
+        self.cube_time = float("{:.6f}".format(time.time() - start_time))
+        if self.debug: print("{} cubes of depth {} in {}s".format(len(self.cubes), depth, self.cube_time))
+
+        sat_result = UNSAT
+        if len(self.cubes) > 0:
+            pool = mp.Pool(min(self.workers, len(self.cubes)), initializer=init_worker,
+                           initargs=(self.num_vars, self.clauses, self.heuristic, self.restart, self.timeout, self.seed))
+            try:
+                results = pool.imap_unordered(solve_cube, self.cubes)
+                for _ in self.cubes:
+                    remaining = self.timeout - (time.time() - start_time)
+                    try:
+                        cube, cube_result, model, stats = results.next(timeout=max(remaining, 0))
+                    except mp.TimeoutError:
+                        sat_result = TIMEOUT
+                        break
+                    if self.debug: print("cube", cube, cube_result, stats["time"])
+                    if cube_result == SAT:
+                        sat_result = SAT
+                        self.model_values = model
+                        break
+                    if cube_result == UNSAT:
+                        self.refuted_count += 1
+                    else:
+                        sat_result = TIMEOUT
+            finally:
+                pool.terminate()
+                pool.join()
+        self.time_taken = float("{:.6f}".format(time.time() - start_time))
+        return sat_result
+
+    def model(self):
+        '''
+        Returns:
+            [int]: the DIMACS literals of the model, None if the last solve call was not SAT
+        '''
+        return self.model_values
+
+    def stats(self):
+        '''
+        Returns:
+            dict: counters of the cube and conquer solve
+        '''
+        return {"variables": self.num_vars, "clauses": len(self.clauses), "time": self.time_taken,
+                "cube_time": self.cube_time, "cubes": len(self.cubes), "refuted": self.refuted_count,
+                "branches": None, "implications": None, "conflicts": None, "learned": None,
+                "restarts": None, "imported": None,
+                "heuristic": "cube and conquer ({} cubes, {})".format(len(self.cubes), self.heuristic),
+                "restart": self.restart}
@@ -1,6 +1,7 @@
 from pprint import pprint
-import copy
-import subprocess
+import multiprocessing as mp
+import mySATSolver
+import cnf_builder
 
 YELLOW, BLUE, RED, GREEN, WHITE                 = 0, 1, 2, 3, 4
 
@@ -12,51 +13,52 @@ DUNHILL, BLENDS, PALLMALL, PRINCE, BLUEMASTERS  = 15, 16, 17, 18, 19
 
 CAT, HORSE, BIRD, FISH, DOG                     = 20, 21, 22, 23, 24
 
-cnf = []
+GROUP_NAMES = ["color", "nationality", "drink", "cigarette", "pet"]
+ITEM_NAMES = ["yellow", "blue", "red", "green", "white",
+              "norwegian", "dane", "brit", "german", "swede",
+              "water", "tea", "milk", "coffee", "beer",
+              "dunhill", "blends", "pallmall", "prince", "bluemasters",
+              "cat", "horse", "bird", "fish", "dog"]
+
+# at-most-one encoding of cnf_builder.AMO_ENCODINGS, groups of 5 are small enough for pairwise
+ENCODING = "pairwise"
+
+builder = cnf_builder.CNFBuilder(encoding=ENCODING)
+cnf = builder.clauses
 
 def get_comb_id(item, house):
-    return (item * 5 + house)
+    return builder.var(item, house)
 
 def found_at(item, house):
-    cnf.append([get_comb_id(item, house)])
+    builder.add_clause([get_comb_id(item, house)])
 
 def in_the_same_house(item1, item2):
     for house in range(1, 6):
-        cnf.append([-get_comb_id(item1, house), get_comb_id(item2, house)])
-        cnf.append([get_comb_id(item1, house), -get_comb_id(item2, house)])
+        builder.equivalent(get_comb_id(item1, house), get_comb_id(item2, house))
 
 def are_neighbours(item1, item2):
-    cnf.append([-get_comb_id(item1, 1), get_comb_id(item2, 2)])
-    cnf.append([-get_comb_id(item2, 1), get_comb_id(item1, 2)])
-    cnf.append([-get_comb_id(item1, 5), get_comb_id(item2, 4)])
-    cnf.append([-get_comb_id(item2, 5), get_comb_id(item1, 4)])
+    builder.implies(get_comb_id(item1, 1), get_comb_id(item2, 2))
+    builder.implies(get_comb_id(item2, 1), get_comb_id(item1, 2))
+    builder.implies(get_comb_id(item1, 5), get_comb_id(item2, 4))
+    builder.implies(get_comb_id(item2, 5), get_comb_id(item1, 4))
     for house in range(2, 5):
-        cnf.append([-get_comb_id(item1, house), get_comb_id(item2, house-1), get_comb_id(item2, house+1)])
-        cnf.append([-get_comb_id(item2, house), get_comb_id(item1, house-1), get_comb_id(item1, house+1)])
+        builder.add_clause([-get_comb_id(item1, house), get_comb_id(item2, house-1), get_comb_id(item2, house+1)])
+        builder.add_clause([-get_comb_id(item2, house), get_comb_id(item1, house-1), get_comb_id(item1, house+1)])
     
 def on_left(item1, item2):
     for house in range(1, 5):
-        cnf.append([-get_comb_id(item1, house), get_comb_id(item2, house+1)])
-        cnf.append([get_comb_id(item1, house), -get_comb_id(item2, house+1)])
+        builder.equivalent(get_comb_id(item1, house), get_comb_id(item2, house+1))
 
 group_index = [0, 5, 10, 15, 20]
 
 #For each house, there only exist 1 item of the same group. 
 for house in range (1, 6):
     for group_id in group_index:
-        for item in range(1, 5):
-            for j in range(group_id, group_id+item):
-                cnf.append([-get_comb_id(group_id+item, house), -get_comb_id(j, house)])
-
-#For each unique item, it cannot exist in two houses.
-for item in range(0, 25):
-    for house in range(1, 6):
-        for i in range(house+1, 6):
-            cnf.append([-get_comb_id(item, house), -get_comb_id(item, i)])
+        builder.at_most_one([get_comb_id(item, house) for item in range(group_id, group_id+5)])
 
-#Each color, cigarette, drink, nationality, and pet must exist in at least one house.
+#Each color, cigarette, drink, nationality, and pet exists in exactly one house.
 for item in range(0, 25):
-    cnf.append([get_comb_id(item, 1), get_comb_id(item, 2), get_comb_id(item, 3), get_comb_id(item, 4), get_comb_id(item, 5)])
+    builder.exactly_one([get_comb_id(item, house) for house in range(1, 6)])
 
 #The Brit lives in the red house.
 in_the_same_house(BRIT, RED)
@@ -105,64 +107,60 @@ are_neighbours(NORWEGIAN, BLUE)
 are_neighbours(BLENDS, WATER)
 
 # pprint(cnf)
-print("total of:")
-print(len(cnf))
-
-
-def write_to_cnf(filename, cnf_input):
-    N = 150
-    L = len(cnf_input)
-    # print(cnf_input)
-
-    w = "c {}\n".format(filename)
-    w += "p cnf {} {}\n".format(N, L)
-    for clause in cnf_input:
-        # print(clause)
-        for literal in clause:
-            w += str(literal) + " "
-        w += "0\n"
-    # print(w)
-    file = open(filename, "w")
-    file.write(w)
-    file.close()
-
-
-for house in range(1, 6):
-    print("\n >> CheckSAT: Fish is found at House {}?".format(house))
-    id = get_comb_id(FISH, house)
-    filename = "einstein.cnf"
-
-    cnf_input = copy.deepcopy(cnf)
-    cnf_input.append([id])
-
-    write_to_cnf(filename, cnf_input)
-
-    bashCommand = "python3 mySATSolver.py einstein.cnf two_clause 0" 
-    cmd = bashCommand.split()
-    f = open("out.txt", "w")
-    subprocess.call(cmd, stdout=f)
-
-    SAT = False
-
-    # read assignments from output
-    file1 = open('out.txt', 'r')
-    Lines = file1.read().splitlines()
-
-    for i in range(len(Lines)-1, 0, -1):
-        line = Lines[i].split(': ')
-
-        if len(line) > 0 and line[0] == 'Assigmenent' and line[1] != "None":
-                assignment = line[1].split(", ")
-
-                for nationality in [NORWEGIAN, DANE, BRIT, GERMAN, SWEDE]:
-                    id = get_comb_id(nationality, house)
-
-                    if assignment[id-1] == str(id):
-                        print("Nationality {} has the fish.".format(nationality)) 
-                        SAT = True
-
-    if SAT:
-        print("Fish found.")
-    else:
-        print("UNSAT")
-        
+fish_ids = [get_comb_id(FISH, house) for house in range(1, 6)]
+
+def get_houses(model):
+    '''
+    Args:
+        model ([int]): DIMACS literals of a model of the puzzle
+    Returns:
+        [dict]: {group name: item name} of each house, from house 1 to 5
+    '''
+    values = builder.decode(model)
+    houses = [{} for house in range(1, 6)]
+    for (item, house), value in values.items():
+        if value:
+            houses[house-1][GROUP_NAMES[item // 5]] = ITEM_NAMES[item]
+    return houses
+
+worker_solver = None  # solver of the puzzle in each pool worker
+
+def init_worker():
+    '''
+    Pool initializer: load the puzzle once per worker, each query only adds an assumption.
+    The fish variables are frozen so that the preprocessing keeps them for the assumptions.
+    '''
+    global worker_solver
+    worker_solver = mySATSolver.new_solver(builder.num_vars, cnf, heuristic="two_clause", frozen=fish_ids)
+
+def check_fish(house):
+    '''
+    Returns:
+        int: the house
+        string: SAT or UNSAT
+        [dict]: the houses of the solution (get_houses()) if SAT, else the failed assumptions
+    '''
+    if worker_solver.solve(assumptions=[get_comb_id(FISH, house)]) == mySATSolver.SAT:
+        return house, mySATSolver.SAT, get_houses(worker_solver.model())
+    return house, mySATSolver.UNSAT, worker_solver.failed_assumptions()
+
+def main():
+    print("total of:")
+    print(len(cnf))
+
+    # the five queries run at the same time, the clauses are passed to the workers directly
+    with mp.Pool(min(5, mp.cpu_count()), initializer=init_worker) as pool:
+        results = pool.map(check_fish, range(1, 6))
+
+    for house, sat_result, answer in results:
+        print("\n >> CheckSAT: Fish is found at House {}?".format(house))
+        if sat_result == mySATSolver.SAT:
+            print("Nationality {} has the fish.".format(answer[house-1]["nationality"]))
+            print("Fish found.")
+            pprint(answer)
+        else:
+            print("UNSAT, failed assumptions:", answer)
+
+
+if __name__ == "__main__":
+    main()
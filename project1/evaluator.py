@@ -0,0 +1,137 @@
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, only this module needs it
+    np = None
+import mySATSolver
+
+# clause state codes of clause_states(), STATE_NAMES gives the mySATSolver constant of each code
+STATE_SAT, STATE_UNSAT, STATE_UNIT, STATE_TWO, STATE_UNRESOLVED = 0, 1, 2, 3, 4
+STATE_NAMES = [mySATSolver.SAT, mySATSolver.UNSAT, mySATSolver.UNIT_CLAUSE, mySATSolver.TWO_CLAUSE, mySATSolver.UNRESOLVED]
+
+def assignment_vector(model, num_vars):
+    '''
+    Args:
+        model ([int]): DIMACS literals, variables that are not in it are unassigned
+        num_vars (int):
+    Returns:
+        numpy array: values indexed by variable, 1 true, 0 false, -1 unassigned, like
+            CDCLSolver.assignments
+    '''
+    values = np.full(num_vars+1, -1, dtype=np.int8)
+    model = np.asarray(model, dtype=np.int64)
+    values[np.abs(model)] = model > 0
+    return values
+
+class FormulaMatrix:
+    '''
+    A formula stored as a matrix of literals, one row per clause, padded with variable 0.
+    The state of every clause is computed for a whole batch of assignments at once, instead
+    of one get_clause_state() call per clause.
+    '''
+
+    def __init__(self, clauses, num_vars=0):
+        '''
+        Args:
+            clauses ([[int]]): DIMACS clauses
+            num_vars (int): at least the largest variable of the clauses
+        '''
+        if np is None:
+            raise ImportError("evaluator.py needs numpy, install it with 'pip install numpy'")
+        clauses = [list(clause) for clause in clauses]
+        width = max([len(clause) for clause in clauses] + [1])
+        literals = np.zeros((len(clauses), width), dtype=np.int64)
+        for index, clause in enumerate(clauses):
+            literals[index, :len(clause)] = clause
+        self.num_vars = max(num_vars, int(np.abs(literals).max(initial=0)))
+        self.num_clauses = len(clauses)
+        self.vars = np.abs(literals)  # variable of each literal, 0 for padding
+        self.signs = (literals > 0).astype(np.int8)  # value that makes each literal true
+        self.mask = self.vars > 0  # False for padding
+
+    def batch(self, assignments):
+        '''
+        Args:
+            assignments: one assignment vector (num_vars+1) or a batch of them (batch, num_vars+1)
+        Returns:
+            numpy array: the assignments as a (batch, num_vars+1) int8 array
+        '''
+        assignments = np.asarray(assignments, dtype=np.int8)
+        if assignments.ndim == 1:
+            assignments = assignments[np.newaxis, :]
+        return assignments
+
+    def clause_counts(self, assignments):
+        '''
+        Returns:
+            numpy array: number of true literals of each clause, (batch, num_clauses)
+            numpy array: number of unassigned literals of each clause, (batch, num_clauses)
+        '''
+        values = self.batch(assignments)[:, self.vars]  # (batch, num_clauses, width)
+        true = (values == self.signs) & self.mask
+        free = (values == -1) & self.mask
+        return true.sum(axis=2), free.sum(axis=2)
+
+    def clause_states(self, assignments):
+        '''
+        Returns:
+            numpy array: state code (STATE_*) of each clause, (batch, num_clauses)
+        '''
+        true, free = self.clause_counts(assignments)
+        states = np.full(true.shape, STATE_UNRESOLVED, dtype=np.int8)
+        states[free == 2] = STATE_TWO
+        states[free == 1] = STATE_UNIT
+        states[free == 0] = STATE_UNSAT
+        states[true > 0] = STATE_SAT
+        return states
+
+    def formula_states(self, assignments):
+        '''
+        Returns:
+            [string]: SAT, UNSAT or UNRESOLVED for each assignment, like get_formula_state()
+        '''
+        states = self.clause_states(assignments)
+        result = []
+        for row in states:
+            if (row == STATE_UNSAT).any():
+                result.append(mySATSolver.UNSAT)
+            elif (row == STATE_SAT).all():
+                result.append(mySATSolver.SAT)
+            else:
+                result.append(mySATSolver.UNRESOLVED)
+        return result
+
+    def unsat_counts(self, assignments):
+        '''
+        Returns:
+            numpy array: number of clauses without a true literal for each complete assignment,
+                the score minimized by local search
+        '''
+        true, _ = self.clause_counts(assignments)
+        return (true == 0).sum(axis=1)
+
+    def check_models(self, models):
+        '''
+        Args:
+            models: assignment vectors, see batch()
+        Returns:
+            numpy array: True for each assignment that satisfies every clause
+        '''
+        return self.unsat_counts(models) == 0
+
+    def literal_counts(self, assignment, two_clauses_only=False):
+        '''
+        Count the occurrences of the unassigned literals in the clauses that are not SAT,
+        like CDCLSolver.literal_counts(), for one assignment.
+        Args:
+            assignment: one assignment vector
+            two_clauses_only (bool): only count the clauses with two unassigned literals
+        Returns:
+            numpy array: occurrences indexed by encoded literal 2*var+sign
+        '''
+        assignment = self.batch(assignment)
+        true, free = self.clause_counts(assignment)
+        rows = (true[0] == 0) & (free[0] == 2 if two_clauses_only else free[0] > 0)
+        values = assignment[0][self.vars[rows]]
+        counted = (values == -1) & self.mask[rows]
+        encoded = 2 * self.vars[rows] + (1 - self.signs[rows])
+        return np.bincount(encoded[counted], minlength=2*self.num_vars+2)
@@ -1,11 +1,19 @@
 import os
 import sys
+import csv
 import time
-import pandas as pd
+import multiprocessing as mp
+from queue import Empty
 from pycryptosat import Solver
 import mySATSolver
+import result_store
 
 SAT_TIME_LIMIT = 600
+KILL_GRACE = 10  # seconds a job may run past SAT_TIME_LIMIT before its worker is killed
+PROOF_DIR = "result/proofs/"  # DRAT proofs of the UNSAT answers, <cnf name>.<heuristic>.drat
+CRYPTOSAT = "cryptosat"
+ERROR = "ERROR"
+WRONG = "WRONG"  # result of a SAT answer whose model does not satisfy the clauses
 
 def run_cryptosat(filename):
     _, _, clauses = mySATSolver.read_input(filename)
@@ -18,61 +26,327 @@ def run_cryptosat(filename):
     time_taken = float("{:.6f}".format(end_time - start_time))
     return sat, time_taken
 
-def write_csv(all_results, output_path):
+def run_solver(filename, heuristic, proof_dir=None):
+    '''
+    Solve one file with one heuristic, the same way as mySATSolver.run_experiment(), with the
+    solver's per-phase profiling on.
+    Args:
+        proof_dir (string): if given, the DRAT proof of an UNSAT answer is kept in it
+    Returns:
+        int: num_vars
+        int: num_clauses
+        tuple: sat_result, time_taken, branching, implication_count, restart_count, then the
+            profile columns of get_profile()
+        [int]: the model if SAT, else None
+    '''
+    num_vars, _, clauses = mySATSolver.read_input(filename)
+    clauses = mySATSolver.get_clauses_set(clauses)
+    proof = None if proof_dir is None else mySATSolver.open_proof(filename, heuristic, proof_dir)
+    solver = mySATSolver.new_solver(num_vars, clauses, heuristic=heuristic, restart=mySATSolver.restart, timeout=SAT_TIME_LIMIT, proof=proof, profile=True)
+    sat_result = solver.solve()
+    if proof is not None:
+        proof.close()
+        if sat_result != mySATSolver.UNSAT:
+            os.remove(proof.path)  # the model is the certificate of SAT
+    result = (sat_result, solver.time_taken, solver.branching, solver.implication_count, solver.restart_count)
+    return num_vars, len(clauses), result + get_profile(solver.stats()), solver.model() if sat_result == mySATSolver.SAT else None
+
+def get_profile(stats):
+    '''
+    Args:
+        stats (dict): CDCLSolver.stats() of a profiled solver
+    Returns:
+        tuple: conflicts, conflicts/sec, propagations/sec, the time of each mySATSolver.PHASES
+            and the learned clause length histogram as a "range:count" string
+    '''
+    phase_times = tuple(round(stats["phases"][phase][1], 6) for phase in mySATSolver.PHASES)
+    histogram = " ".join("{}:{}".format(size, count) for size, count in stats["learned_histogram"].items())
+    return (stats["conflicts"], round(stats["conflicts_per_sec"], 1), round(stats["propagations_per_sec"], 1)) + phase_times + (histogram,)
+
+def run_job(job, results, proof_dir=None):
+    '''
+    Worker process: run one (filename, heuristic) job and put its result and model on the queue.
+    '''
+    filename, heuristic = job
+    if heuristic == CRYPTOSAT:
+        results.put((job, run_cryptosat(filename), None))
+    else:
+        num_vars, num_clauses, result, model = run_solver(filename, heuristic, proof_dir)
+        results.put((job, (num_vars, num_clauses, result), model))
+
+def get_config():
+    '''
+    Returns:
+        string: the solver settings, besides the heuristic, that results are stored under
+    '''
+    return "restart={} timeout={} preprocessing={}".format(mySATSolver.restart, SAT_TIME_LIMIT, mySATSolver.use_preprocessing)
+
+def to_record(heuristic, result):
+    '''
+    Returns:
+        dict: the result of a job as the columns of the result store
+    '''
+    if heuristic == CRYPTOSAT:
+        sat, time_taken = result
+        return {'result': None if sat is None else str(sat), 'time': time_taken}
+    num_vars, num_clauses, result = result
+    return dict(zip(result_store.RESULT_COLUMNS, [num_vars, num_clauses] + list(result)))
+
+def from_record(heuristic, record):
+    '''
+    Returns:
+        the result of a job from the columns of the result store, the inverse of to_record()
+    '''
+    if heuristic == CRYPTOSAT:
+        sat = None if record['result'] is None else record['result'] == "True"
+        return sat, record['time']
+    result = tuple(record[column] for column in result_store.RESULT_COLUMNS[2:])
+    return record['variables'], record['clauses'], result
+
+def check_models(filename, file_results, models):
+    '''
+    Check the models of all the SAT results of a file against its clauses in one batch
+    (mySATSolver.verify_models()), and mark the results whose model is wrong as WRONG.
+    Args:
+        file_results (dict): {heuristic: result}, updated in place
+        models (dict): {heuristic: model} of the SAT results
+    Returns:
+        [string]: the heuristics whose model is wrong
+    '''
+    if len(models) == 0:
+        return []
+    _, _, clauses = mySATSolver.read_input(filename)
+    heuristics = list(models)
+    verified = mySATSolver.verify_models(clauses, [models[h] for h in heuristics])
+    wrong = []
+    for h, correct in zip(heuristics, verified):
+        if not correct:
+            num_vars, num_clauses, result = file_results[h]
+            file_results[h] = (num_vars, num_clauses, (WRONG,) + tuple(result[1:]))
+            wrong.append(h)
+    return wrong
+
+def get_title():
     title = ['filename','variables','clauses', 'SAT', 'time_cryptosat']
-    result_title = ['result', 'time', 'branches', 'implications']
+    result_title = result_store.RESULT_COLUMNS[2:]
     heuristics_list = mySATSolver.heuristics_list
     
     for h in heuristics_list:
         for r in result_title:
             title.append(r + '_' + h)
-    # print(len(title))
+    return title
+
+def get_row(filename, file_results):
+    '''
+    Returns:
+        list: the csv row of a file whose jobs have all finished, in the order of get_title()
+    '''
+    row = [filename.split('/')[-1], None, None]
+    row.extend(file_results[CRYPTOSAT])
+    for h in mySATSolver.heuristics_list:
+        num_vars, num_clauses, result = file_results[h]
+        if num_vars is not None:
+            row[1], row[2] = num_vars, num_clauses
+        row.extend(result)
+    return row
+
+def get_jobs(input_path):
+    jobs = []
+    for root, dirs, files in os.walk(input_path, topdown=False):
+        for name in files:
+            filename = os.path.join(root, name)
+            if mySATSolver.is_cnf_file(filename):
+                jobs.append((filename, CRYPTOSAT))
+                for h in mySATSolver.heuristics_list:
+                    jobs.append((filename, h))
+    return jobs
+
+def remove_partial_proof(job, proof_dir):
+    '''
+    Delete the unfinished proof of a job whose worker was killed or crashed, so that it is
+    not taken for a certificate.
+    '''
+    if proof_dir is None:
+        return
+    filename, heuristic = job
+    path = os.path.join(proof_dir, "{}.{}.drat".format(os.path.basename(filename), heuristic))
+    if os.path.exists(path):
+        os.remove(path)
 
+def failed_result(heuristic, sat_result):
+    '''
+    Returns:
+        the result recorded for a job whose worker was killed (TIMEOUT) or crashed (ERROR)
+    '''
+    time_taken = SAT_TIME_LIMIT if sat_result == mySATSolver.TIMEOUT else None
+    if heuristic == CRYPTOSAT:
+        return None, time_taken
+    return None, None, (sat_result, time_taken) + (None,) * (len(result_store.RESULT_COLUMNS) - 4)
+
+def run_experiments(input_path, output_path, workers=None, store=None, proof_dir=PROOF_DIR):
+    '''
+    Run every (file, heuristic) job under input_path in a pool of worker processes and write
+    each file's row to the csv as soon as all of its jobs are done. A worker still running
+    KILL_GRACE seconds after SAT_TIME_LIMIT is killed and its job recorded as TIMEOUT.
+    Args:
+        input_path (string): directory of cnf files
+        output_path (string): csv file
+        workers (int): number of worker processes, default is the number of cpus
+        store (ResultStore): if given, jobs already in the store are not run again and every
+            new result is saved in it
+        proof_dir (string): directory of the DRAT proofs of the UNSAT answers, None to write no proof
+    Returns:
+        int: number of rows written
+    '''
+    if workers is None:
+        workers = os.cpu_count()
     if ".csv" not in output_path:
         output_path += ".csv"
-    df = pd.DataFrame(all_results, columns=title) 
-    df.to_csv(output_path)
+    config = get_config()
+    cnf_hashes = {}  # filename: content hash
+    cached = []
+    jobs = []
+    for job in get_jobs(input_path):
+        if store is None:
+            jobs.append(job)
+            continue
+        filename, heuristic = job
+        if filename not in cnf_hashes:
+            cnf_hashes[filename] = result_store.hash_cnf(filename)
+        record = store.get(cnf_hashes[filename], mySATSolver.SOLVER_VERSION, heuristic, config)
+        if record is None:
+            jobs.append(job)
+        else:
+            cached.append((job, from_record(heuristic, record)))
+    print("{} jobs to run, {} already in the result store".format(len(jobs), len(cached)))
+    jobs.reverse()  # pop() from the end, in walk order
+    jobs_per_file = len(mySATSolver.heuristics_list) + 1
+    results = mp.Queue()
+    running = {}  # job: (process, start_time)
+    finished = {}  # filename: {heuristic: result}
+    models = {}  # filename: {heuristic: model} of the SAT results, checked once the file is done
+    rows_written = 0
+
+    csv_file = open(output_path, 'w', newline='')
+    writer = csv.writer(csv_file)
+    writer.writerow([''] + get_title())
+    csv_file.flush()
+
+    def record(job, result, save=True, model=None):
+        nonlocal rows_written
+        filename, heuristic = job
+        if store is not None and save:
+            store.put(cnf_hashes[filename], mySATSolver.SOLVER_VERSION, heuristic, config, filename, to_record(heuristic, result))
+        finished.setdefault(filename, {})[heuristic] = result
+        if model is not None:
+            models.setdefault(filename, {})[heuristic] = model
+        if len(finished[filename]) == jobs_per_file:
+            file_results = finished.pop(filename)
+            for h in check_models(filename, file_results, models.pop(filename, {})):
+                print("Wrong model:", filename, h)
+                if store is not None:
+                    store.put(cnf_hashes[filename], mySATSolver.SOLVER_VERSION, h, config, filename, to_record(h, file_results[h]))
+            row = get_row(filename, file_results)
+            print("Solved", row)
+            writer.writerow([rows_written] + row)
+            csv_file.flush()
+            rows_written += 1
 
-def run_experiments(input_path):
-    all_results = []
     try:
-        for root, dirs, files in os.walk(input_path, topdown=False):
-            for name in files:
-                filename = os.path.join(root, name)
-                if os.path.splitext(filename)[1] == '.cnf':
-                    if "sat" or "unsat" in filename:
-                        print(filename)
-                        result = mySATSolver.run_experiment(filename)   
-                        
-                        sat, time = run_cryptosat(filename)
-                        result.insert(3, sat)
-                        result.insert(4, time)
-
-                        print("Solved", result)
-                        all_results.append(result)
-
-                        # break
+        for job, result in cached:
+            record(job, result, save=False)
+        while len(jobs) > 0 or len(running) > 0:
+            while len(jobs) > 0 and len(running) < workers:
+                job = jobs.pop()
+                print(job[0], job[1])
+                process = mp.Process(target=run_job, args=(job, results, proof_dir), daemon=True)
+                process.start()
+                running[job] = (process, time.time())
+            try:
+                job, result, model = results.get(timeout=0.1)
+                running.pop(job)[0].join()
+                record(job, result, model=model)
+            except Empty:
+                pass
+            now = time.time()
+            for job, (process, start_time) in list(running.items()):
+                if process.exitcode not in [None, 0]:
+                    # crashed without a result
+                    process.join()
+                    running.pop(job)
+                    remove_partial_proof(job, proof_dir)
+                    record(job, failed_result(job[1], ERROR), save=False)
+                elif now - start_time > SAT_TIME_LIMIT + KILL_GRACE:
+                    process.terminate()
+                    process.join()
+                    running.pop(job)
+                    remove_partial_proof(job, proof_dir)
+                    record(job, failed_result(job[1], mySATSolver.TIMEOUT))
     except KeyboardInterrupt:
-        print("KeyboardInterrupt... Stopping and saving output to csv file...")
-        return all_results
-    return all_results
-    
+        print("KeyboardInterrupt... Stopping, {} rows are saved in {}".format(rows_written, output_path))
+        for job, (process, _) in running.items():
+            process.terminate()
+            process.join()
+            remove_partial_proof(job, proof_dir)
+    finally:
+        csv_file.close()
+    return rows_written
+
+def export_csv(store, output_path):
+    '''
+    Write the csv of every file that has all of its results in the store, for the current
+    solver version and config.
+    Returns:
+        int: number of rows written
+    '''
+    if ".csv" not in output_path:
+        output_path += ".csv"
+    jobs_per_file = len(mySATSolver.heuristics_list) + 1
+    rows_written = 0
+    with open(output_path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow([''] + get_title())
+        for filename, records in store.get_all(mySATSolver.SOLVER_VERSION, get_config()).values():
+            if len(records) < jobs_per_file:
+                continue
+            file_results = {h: from_record(h, records[h]) for h in records}
+            writer.writerow([rows_written] + get_row(filename, file_results))
+            rows_written += 1
+    print("{} rows exported to {}".format(rows_written, output_path))
+    return rows_written
+
 def main():
-    if len(sys.argv) != 3:
+    proof_dir = PROOF_DIR
+    if "--no-proof" in sys.argv:
+        sys.argv.remove("--no-proof")
+        proof_dir = None
+    if len(sys.argv) == 3 and sys.argv[1] == "--export":
+        store = result_store.ResultStore()
+        export_csv(store, sys.argv[2])
+        store.close()
+        return
+    if len(sys.argv) not in [3, 4]:
         print("Hi, this program will run SAT_Solver in 'mySATSolver.py' on all cnf files (on all heuristics), then output the results in a csv file.")
-        print("  Usage: python3 experiments.py [cnf_dirname] [output_filename]")
-        print("  - eg: python3 experiments.py CS4244_project/sat/ result/experiments.csv") 
+        print("  Usage: python3 experiments.py [cnf_dirname] [output_filename] [num_workers, default: cpu count]")
+        print("  - eg: python3 experiments.py CS4244_project/sat/ result/experiments.csv 8") 
+        print("  Results are also saved in '{}', files already solved by the same solver version are skipped.".format(result_store.DEFAULT_DB))
+        print("  The DRAT proof of every UNSAT answer is written to '{}', add --no-proof to skip them.".format(PROOF_DIR))
+        print("  Usage: python3 experiments.py --export [output_filename]")
+        print("  - export every result in the store as a csv file")
         sys.exit()
 
     input_path = sys.argv[1]
     output_path = sys.argv[2] 
+    workers = int(sys.argv[3]) if len(sys.argv) == 4 else None
 
     if not os.path.exists(input_path):
         print("'{}' path not exits.".format(input_path))
 
-    all_results = run_experiments(input_path)
-    
-    write_csv(all_results, output_path)
+    store = result_store.ResultStore()
+    try:
+        run_experiments(input_path, output_path, workers, store, proof_dir)
+    finally:
+        store.close()
 
 
 if __name__ == "__main__":
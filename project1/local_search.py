@@ -0,0 +1,256 @@
+import time
+import random
+import mySATSolver
+from mySATSolver import SAT, UNSAT, TIMEOUT
+
+MAX_FLIPS = {"walksat": 100000, "probsat": 1000000}  # flips of one try before restarting from a new random assignment, probSAT gains little from restarts
+WALKSAT_NOISE = 0.567  # probability of a random walk step when every variable of the clause breaks some clause
+PROBSAT_EPS = 1.0
+PROBSAT_CB = {3: 2.38, 4: 3.0, 5: 3.7, 6: 5.1, 7: 5.4}  # break weight base by the longest clause length
+MAX_BREAK = 64  # break counts above this get the weight of MAX_BREAK in probSAT
+TIME_CHECK_FLIPS = 1024  # flips between two checks of the timeout
+
+class LocalSearchSolver:
+    '''
+    Stochastic local search for satisfiable formulas, with the WalkSAT (SKC) or probSAT flip
+    rule. Each try starts from a random complete assignment and flips one variable of a random
+    unsatisfied clause at a time. It cannot prove UNSAT, so solve() answers SAT, or TIMEOUT when
+    the time is up, and UNSAT only for an empty clause. Has the same add_clause/solve/model/stats
+    interface as CDCLSolver.
+
+    Every clause keeps its number of true literals and the sum of their variables, which is the
+    one variable that breaks it when a single literal is true. The break and make counts of each
+    variable are updated on every flip through the occurrence lists of its two literals, and
+    the unsatisfied clauses are kept in a list with the position of each one.
+
+    Usage:
+        solver = LocalSearchSolver(num_vars, algorithm="probsat")
+        for clause in clauses:
+            solver.add_clause(clause)
+        if solver.solve() == SAT:
+            print(solver.model())
+    '''
+
+    def __init__(self, num_vars=0, algorithm="probsat", timeout=None, seed=None, max_flips=None, debug=False):
+        '''
+        Args:
+            num_vars (int): number of variables, more are created by add_clause if needed
+            algorithm (string): "walksat" or "probsat"
+            timeout (float): time limit in seconds of each solve call, default timeout_limit
+            seed (int): seed of the initial assignments and of the flips
+            max_flips (int): flips of one try, default MAX_FLIPS of the algorithm
+            debug (bool): print every try
+        '''
+        if algorithm not in mySATSolver.local_search_list:
+            raise ValueError("'{}' is not a local search algorithm in {}".format(algorithm, mySATSolver.local_search_list))
+        self.num_vars = num_vars
+        self.algorithm = algorithm
+        self.timeout = mySATSolver.timeout_limit if timeout is None else timeout
+        self.random = random.Random(seed)
+        self.max_flips = MAX_FLIPS[algorithm] if max_flips is None else max_flips
+        self.debug = debug
+        self.clauses = []  # encoded literals 2*var+sign, without duplicates and tautologies
+        self.has_empty_clause = False
+        self.preprocessor = None  # set by new_solver, extends the model to the eliminated variables
+        self.proof = None
+        self.model_values = None
+        self.flips = 0
+        self.tries = 0
+        self.time_taken = 0
+        self.setup_time = 0  # time of the preprocessing in new_solver, counted in the next solve call
+        # same names as the counters of CDCLSolver, a flip is counted as a branch
+        self.branching = 0
+        self.implication_count = 0
+        self.restart_count = 0
+
+    def add_clause(self, clause):
+        '''
+        Args:
+            clause ([int]): DIMACS literals
+        '''
+        if self.preprocessor is not None:
+            self.preprocessor.check_frozen(clause)
+        literals = set()
+        for literal in clause:
+            self.num_vars = max(self.num_vars, abs(literal))
+            literals.add(mySATSolver.encode_literal(literal))
+        if any(literal ^ 1 in literals for literal in literals):
+            return  # always satisfied
+        if len(literals) == 0:
+            self.has_empty_clause = True
+        self.clauses.append(sorted(literals))
+
+    def solve(self):
+        '''
+        Returns:
+            string: SAT, TIMEOUT, or UNSAT if there is an empty clause
+        '''
+        start_time = time.time() - self.setup_time  # the timeout and time_taken include the preprocessing
+        self.setup_time = 0
+        self.model_values = None
+        sat_result = TIMEOUT
+        if self.has_empty_clause:
+            sat_result = UNSAT
+        else:
+            self.init_occurrences()
+            while time.time() - start_time < self.timeout:
+                self.tries += 1
+                self.init_assignment()
+                if self.search(start_time):
+                    sat_result = SAT
+                    self.model_values = self.values
+                    break
+                if self.debug: print("try {}: {} unsatisfied clauses left after {} flips".format(self.tries, len(self.unsat), self.flips))
+        self.branching = self.flips
+        self.restart_count = max(0, self.tries - 1)
+        self.time_taken = float("{:.6f}".format(time.time() - start_time))
+        return sat_result
+
+    def init_occurrences(self):
+        '''
+        Build the occurrence list of every literal and the probSAT break weights.
+        '''
+        self.occurs = [[] for _ in range(2*self.num_vars+2)]
+        for index, clause in enumerate(self.clauses):
+            for literal in clause:
+                self.occurs[literal].append(index)
+        max_size = max([len(clause) for clause in self.clauses] + [3])
+        if max_size <= 3:
+            cb = PROBSAT_CB[3]
+            self.break_weights = [(PROBSAT_EPS + b) ** -cb for b in range(MAX_BREAK+1)]
+        else:
+            cb = PROBSAT_CB[min(max_size, 7)]
+            self.break_weights = [cb ** -b for b in range(MAX_BREAK+1)]
+
+    def init_assignment(self):
+        '''
+        Start a try from a random assignment, and count the true literals, break and make
+        counts and unsatisfied clauses from scratch.
+        '''
+        values = [0] + [self.random.getrandbits(1) for _ in range(self.num_vars)]
+        self.values = values
+        self.true_count = [0] * len(self.clauses)
+        self.true_sum = [0] * len(self.clauses)
+        self.break_count = [0] * (self.num_vars+1)
+        self.make_count = [0] * (self.num_vars+1)
+        self.unsat = []  # indices of the unsatisfied clauses
+        self.unsat_position = [-1] * len(self.clauses)  # index of each clause in unsat, -1 if satisfied
+        for index, clause in enumerate(self.clauses):
+            for literal in clause:
+                if values[literal >> 1] != literal & 1:
+                    self.true_count[index] += 1
+                    self.true_sum[index] += literal >> 1
+            if self.true_count[index] == 0:
+                self.add_unsat(index)
+            elif self.true_count[index] == 1:
+                self.break_count[self.true_sum[index]] += 1
+
+    def add_unsat(self, index):
+        self.unsat_position[index] = len(self.unsat)
+        self.unsat.append(index)
+        for literal in self.clauses[index]:
+            self.make_count[literal >> 1] += 1
+
+    def remove_unsat(self, index):
+        position = self.unsat_position[index]
+        last = self.unsat.pop()
+        if last != index:
+            self.unsat[position] = last
+            self.unsat_position[last] = position
+        self.unsat_position[index] = -1
+        for literal in self.clauses[index]:
+            self.make_count[literal >> 1] -= 1
+
+    def flip(self, var):
+        '''
+        Flip the variable and update the counts of the clauses of its two literals.
+        '''
+        self.values[var] ^= 1
+        true_literal = 2*var + (self.values[var] ^ 1)
+        true_count, true_sum, break_count = self.true_count, self.true_sum, self.break_count
+        for index in self.occurs[true_literal]:
+            count = true_count[index]
+            if count == 0:
+                self.remove_unsat(index)
+                break_count[var] += 1
+            elif count == 1:
+                break_count[true_sum[index]] -= 1
+            true_count[index] = count + 1
+            true_sum[index] += var
+        for index in self.occurs[true_literal ^ 1]:
+            count = true_count[index] - 1
+            true_count[index] = count
+            true_sum[index] -= var
+            if count == 0:
+                break_count[var] -= 1
+                self.add_unsat(index)
+            elif count == 1:
+                break_count[true_sum[index]] += 1
+        self.flips += 1
+
+    def pick_walksat(self, clause):
+        '''
+        Returns:
+            int: a variable of the clause that breaks no clause, else a random one with
+                probability WALKSAT_NOISE, else the one that breaks the fewest and makes the most
+        '''
+        best_var, best_score = None, None
+        for literal in clause:
+            var = literal >> 1
+            if self.break_count[var] == 0:
+                return var
+            score = (self.break_count[var], -self.make_count[var])
+            if best_score is None or score < best_score:
+                best_var, best_score = var, score
+        if self.random.random() < WALKSAT_NOISE:
+            return self.random.choice(clause) >> 1
+        return best_var
+
+    def pick_probsat(self, clause):
+        '''
+        Returns:
+            int: a variable of the clause, picked with a probability that decreases with its break count
+        '''
+        weights = [self.break_weights[min(self.break_count[literal >> 1], MAX_BREAK)] for literal in clause]
+        return self.random.choices(clause, weights)[0] >> 1
+
+    def search(self, start_time):
+        '''
+        Flip until every clause is satisfied, max_flips is reached or the time is up.
+        Returns:
+            bool: True if the assignment satisfies every clause
+        '''
+        pick = self.pick_walksat if self.algorithm == "walksat" else self.pick_probsat
+        unsat, clauses, randrange = self.unsat, self.clauses, self.random.randrange
+        for flip in range(self.max_flips):
+            if len(unsat) == 0:
+                return True
+            if flip % TIME_CHECK_FLIPS == 0 and time.time() - start_time > self.timeout:
+                return False
+            self.flip(pick(clauses[unsat[randrange(len(unsat))]]))
+        return len(unsat) == 0
+
+    def model(self):
+        '''
+        Returns:
+            [int]: the DIMACS literals of the model found by the last solve call, None if it was not SAT
+        '''
+        if self.model_values is None:
+            return None
+        model = [var if self.model_values[var] == 1 else -var for var in range(1, self.num_vars+1)]
+        if self.preprocessor is not None:
+            return self.preprocessor.extend_model(model)
+        return model
+
+    def stats(self):
+        '''
+        Returns:
+            dict: counters of the solver, accumulated over all solve calls, in the keys of
+                CDCLSolver.stats() where they apply
+        '''
+        return {"variables": self.num_vars, "clauses": len(self.clauses), "time": self.time_taken,
+                "branches": self.flips, "implications": 0, "conflicts": None, "learned": 0,
+                "restarts": self.restart_count, "imported": 0, "heuristic": self.algorithm,
+                "restart": "{} flips per try".format(self.max_flips), "flips": self.flips,
+                "tries": self.tries, "unsat_clauses": None if self.tries == 0 else len(self.unsat),
+                "preprocess": None if self.preprocessor is None else self.preprocessor.stats()}
@@ -1,8 +1,13 @@
 import os
 import sys
+import bz2
+import gzip
+import lzma
+import mmap
 import time
 import random
-from collections import Counter
+from array import array
+from collections import Counter, deque
 
 UNSAT = "UNSAT"
 SAT = "SAT"
@@ -12,520 +17,1564 @@ UNRESOLVED = "UNRESOLVED"
 CONFLICT = "CONFLICT"
 TIMEOUT = "TIMEOUT"
 
-def get_literal_value(literal):
-    '''
-    Args:
-        literal (int):       
-    Returns:
-        int: Return the value of the literal. Return -1 if unassigned.
-    '''
-    var = abs(literal)
-    if assignments[var] == -1:
-        return -1   #unassigned
-    if literal > 0:  
-        return assignments[var]
-    else:
-        return 1 - assignments[var]
+# Inside the solver a literal x is encoded as 2*abs(x) + (1 if x < 0 else 0), so that
+# literal_values, watches and vsids_score are plain lists indexed by literal, and the
+# negation of a literal is literal ^ 1.
 
-def get_clause_state(clause):
+def encode_literal(literal):
     '''
     Args:
-        clause ({int}):       
+        literal (int): DIMACS literal
     Returns:
-        string: Return whether the clause is SAT, UNSAT, UNIT_CLAUSE 
-                or (UNRESOLVED, number of unassigned literals)
+        int: Return the encoded literal 2*var+sign.
     '''
-    values = [get_literal_value(literal) for literal in clause]
-    if max(values) == 1:
-        return SAT  #SAT
-    unassigned = values.count(-1)
-    if unassigned == 1:
-        return UNIT_CLAUSE
-    elif unassigned > 1:
-        if unassigned == 2:
-            return TWO_CLAUSE
-        else:
-            return (UNRESOLVED, unassigned) #number of unassigned literals
-    else:
-        return UNSAT  #UNSAT
+    if literal > 0:
+        return literal << 1
+    return (-literal << 1) | 1
 
-def get_formula_state(formula):
+def decode_literal(literal):
     '''
     Args:
-        formula ([{int}]):       
+        literal (int): encoded literal
     Returns:
-        string: Return whether the formula is SAT, UNSAT or UNRESOLVED.
+        int: Return the DIMACS literal.
     '''
-    for clause in formula:
-        value = get_clause_state(clause)
-        if value == UNSAT:
-            return UNSAT
-        elif value != SAT:
-            return UNRESOLVED
-    return SAT
-
-def check_formula_state(formula):
-    print("\nChecking formula on current assignments:", assignments)
-    for clause in formula:
-        check_clause_state(clause)
-    print("Formula state:", get_formula_state(formula))
-
-def check_clause_state(clause):
-    values = [get_literal_value(literal) for literal in clause]
-    print(clause, values, get_clause_state(clause))
-
-def get_unit_literal(unit_clause):
-    '''
-    Args:
-        unit_clause ({int}):       
-    Returns:
-        int: Return the only unassigned literal in the unit_clause.
-    '''
-    for literal in unit_clause:
-        if get_literal_value(literal) == -1:
-            return literal
+    if literal & 1:
+        return -(literal >> 1)
+    return literal >> 1
 
 def get_literal_sign(unit_literal):
     '''
     Args:
-        unit_literal (int):       
+        unit_literal (int): encoded literal
     Returns:
         int: Return 1 if the literal is positive, 0 if negative.
     '''
-    if unit_literal > 0:
-        return 1
-    return 0
+    return 1 - (unit_literal & 1)
 
-def assign_implied_var(unit_clause, unit_literal):
+def luby(i):
     '''
-    Assign value to decision variable, update it's decision level.
     Args:
-        decision_var (int):
-    '''
-    global assignments, antecedents, decision_levels
-    var = abs(unit_literal)
-    assignments[var] = get_literal_sign(unit_literal)
-    antecedents[var] = unit_clause
-    decision_levels[var] = curr_level
-    if debug: print(" > prop assign x{} of value_{} at lvl_{}, in clause {}".format(unit_literal,get_literal_sign(unit_literal), curr_level, unit_clause))
-
-def unit_propagation():
-    '''
-    Iterated application of unit clause rule.
+        i (int): index in the sequence, starting from 0
     Returns:
-        string: Return CONFLICT if UNSAT clause is found. Return None if no conflict.
+        int: i-th element of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
     '''
-    global antecedents, decision_levels, implication_count
-    i = 0
-    while True:
-        i += 1
-        propList = []
-        if debug: print("> #{} unit_prop on clauses :".format(i)) #, clauses.union(learned_clauses))
-        for clause in clauses.union(learned_clauses):
-            state = get_clause_state(clause)
-            if state == UNSAT:
-                antecedents[0] = clause
-                decision_levels[0] = curr_level
-                # update_graph(clause, 0)
-                if debug: print("CONFLICT clause", clause)
-                return CONFLICT
-            elif state == UNIT_CLAUSE: 
-                propList.append(clause)
-            
-        if len(propList) == 0:  
-            if debug: print("unit prop done")
-            return None
-        if debug: print(" propList:", propList)
-        for unit_clause in propList:
-            implication_count += 1
-            unit_literal = get_unit_literal(unit_clause)
-            if unit_literal == None:
-                if get_clause_state(unit_clause) == UNSAT:
-                    antecedents[0] = unit_clause
-                    decision_levels[0] = curr_level
-                    # update_graph(unit_clause, 0)
-                    if debug: print(" (unit_literal is None) CONFLICT clause", unit_clause)
-                    return CONFLICT
-            else:
-                assign_implied_var(unit_clause, unit_literal)
-                # update_graph(unit_clause, unit_literal)
+    size, power = 1, 0
+    while size < i + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        power -= 1
+        i = i % size
+    return 2 ** power
 
-def resolution_of(clauseA, clauseB):
+class CDCLSolver:
     '''
-    Return the resolution of 2 clauses.
-    Args:
-        clauseA ([int]):
-        clauseB ([int]):         
-    Returns:
-        {int}: Clause
+    CDCL SAT solver. All the state of a solve lives in the solver object, so several
+    solvers can be used in the same process.
+
+    Usage:
+        solver = CDCLSolver(heuristic="VSIDS", restart="luby")
+        for clause in clauses:
+            solver.add_clause(clause)
+        if solver.solve() == SAT:
+            print(solver.model())
     '''
-    result = set(clauseA)
-    for literal in clauseB:
-        if -literal in clauseA:
-            # print(literal)
-            result.remove(-literal)
+
+    def __init__(self, num_vars=0, heuristic="VSIDS", restart="luby", phase=None, timeout=None, seed=None, profile=False, debug=False):
+        '''
+        Args:
+            num_vars (int): number of variables to create, more are created by add_clause if needed
+            heuristic (string): branching heuristic, a key of heuristics
+            restart (string): restart strategy, a key of restart_strategies
+            phase (string): polarity of the decisions, one of phase_modes. "heuristic" keeps the
+                heuristic's choice, "saved" reuses the last value of the variable, "target" the
+                value it had in the longest conflict free trail since the last restart. Default
+                "target", but "heuristic" for VSIDS, whose literal scores already pick a good polarity
+            timeout (float): time limit in seconds of each solve call, default timeout_limit
+            seed (int): seed of the random choices in the heuristics
+            profile (bool): time each phase of the search and print progress lines
+            debug (bool): print the solver steps
+        '''
+        if heuristic not in heuristics:
+            raise ValueError("'{}' is not a valid heuristic in {}.".format(heuristic, heuristics_list))
+        if restart not in restart_strategies:
+            raise ValueError("'{}' is not a valid restart strategy in {}.".format(restart, restart_strategies_list))
+        if phase is None:
+            phase = "heuristic" if heuristic == "VSIDS" else "target"
+        if phase not in phase_modes:
+            raise ValueError("'{}' is not a valid phase mode in {}.".format(phase, phase_modes))
+        self.heuristic = getattr(self, heuristics[heuristic])
+        self.restart_strategy = getattr(self, restart_strategies[restart])
+        self.use_vsids = heuristic == "VSIDS"
+        self.use_counts = heuristic in ["two_clause", "DLCS"]  # keep the literal counts of literal_counts() up to date
+        self.phase_mode = phase
+        self.timeout = timeout_limit if timeout is None else timeout
+        self.random = random.Random(seed)
+        self.debug = debug
+        self.ok = True  # False once the clauses are UNSAT at level 0
+
+        self.num_vars = 0
+        self.num_clauses = 0  # input clauses in the clause arena
+        self.num_learned = 0  # learned clauses in the clause arena
+
+        # clause i is clause_lits[clause_start[i] : clause_start[i]+clause_size[i]]
+        self.clause_lits = array('i')
+        self.clause_start = array('i')
+        self.clause_size = array('i')
+        self.clause_lbd = array('i')  # literal block distance, 0 for input clauses
+        self.clause_activity = []  # bumped when a learned clause takes part in conflict analysis
+        self.clause_inc = 1
+
+        self.assignments = [-1]
+        self.literal_values = [-1, -1]  # value of each encoded literal
+        self.antecedents = [None]  # clause id of each implied variable, antecedents[0] is the conflict clause
+        self.decision_levels = [-1]
+        self.watches = [[], []]  # long clauses watching each literal
+        self.binaries = [[], []]  # binary clauses of each literal, as (other literal, clause id) pairs flattened
+        self.trail = []  # assigned literals in assignment order
+        self.trail_lim = []  # trail index where each decision level starts
+        self.prop_head = 0  # trail index of the next literal to propagate
+        self.binary_head = 0  # trail index of the next literal to propagate in the binary clauses
+        self.curr_level = 0
+        self.seen = [False]  # variables marked during conflict analysis
+        self.seen_vars = []  # marked variables, to clear seen afterwards
+
+        self.var_frequency = [0]  # variable frequency in the input clauses
+        self.vsids_score = [0, 0]
+        self.vsids_inc = 1
+        self.vsids_heap = []
+        self.vsids_heap_index = [-1]
+
+        # phases are the sign bit of the literal, 0 for true and 1 for false, -1 if there is none
+        self.saved_phase = [-1]  # value of each variable when it was last unassigned
+        self.target_phase = [-1]  # values of the longest conflict free trail since the last restart
+        self.best_phase = [-1]  # values of the longest conflict free trail since the last rephase
+        self.target_size = 0
+        self.best_size = 0
+        self.rephase_count = 0
+        self.next_rephase = REPHASE_INTERVAL  # conflict count of the next rephase
+
+        # occurrence lists and counters of literal_counts(), used if use_counts. They are updated
+        # lazily: sync_counts() applies the trail literals from counted_head on, backtrack() undoes them.
+        self.occurs = [[], []]  # clause ids of each encoded literal
+        self.clause_true = array('i')  # number of true literals of each clause
+        self.clause_free = array('i')  # number of unassigned literals of each clause
+        self.unresolved_count = [0, 0]  # clauses of each literal without a true literal
+        self.binary_count = [0, 0]  # clauses of each literal without a true literal and with 2 unassigned literals
+        self.counted_head = 0
+        self.inputs = []  # for debug purpose: by specifying pick sequence in random heuristic
+
+        self.branching = 0
+        self.implication_count = 0
+        self.conflict_count = 0
+        self.learned_count = 0
+        self.restart_count = 0
+        self.imported_count = 0
+        self.time_taken = 0
+        self.total_time = 0  # time of all solve calls
+        self.setup_time = 0  # time of the preprocessing in new_solver, counted in the next solve call
+        self.profile = profile
+        self.phase_time = dict.fromkeys(PHASES, 0.0)  # seconds spent in each phase, if profile
+        self.phase_calls = dict.fromkeys(PHASES, 0)
+        self.learned_sizes = Counter()  # number of learned clauses of each length, if profile
+        self.reduce_interval = REDUCE_FIRST
+        self.next_reduce = REDUCE_FIRST  # conflict count of the next learned clause reduction
+        self.conflicts_since_restart = 0
+        self.lbd_sum = 0  # sum of the LBD of all learned clauses
+        self.recent_lbd = deque(maxlen=GLUCOSE_WINDOW)  # LBD of the last GLUCOSE_WINDOW learned clauses since restart
+        self.recent_lbd_sum = 0
+        self.model_values = None
+        self.conflict_core = None  # failed assumptions of the last UNSAT solve call
+        self.exchange = None  # ClauseExchange shared with solvers of the same formula, see portfolio.py
+        self.preprocessor = None  # Preprocessor of the clauses, model() completes its eliminated variables
+        self.proof = None  # DratWriter of proof.py, gets the learned and deleted clauses
+
+        for var in range(num_vars):
+            self.new_var()
+
+    def new_var(self):
+        '''
+        Returns:
+            int: the new variable
+        '''
+        self.num_vars += 1
+        var = self.num_vars
+        self.assignments.append(-1)
+        self.literal_values.extend((-1, -1))
+        self.antecedents.append(None)
+        self.decision_levels.append(-1)
+        self.watches.extend(([], []))
+        self.binaries.extend(([], []))
+        self.seen.append(False)
+        self.var_frequency.append(0)
+        self.vsids_score.extend((0, 0))
+        self.vsids_heap_index.append(-1)
+        self.saved_phase.append(-1)
+        self.target_phase.append(-1)
+        self.best_phase.append(-1)
+        self.occurs.extend(([], []))
+        self.unresolved_count.extend((0, 0))
+        self.binary_count.extend((0, 0))
+        if self.use_vsids:
+            self.heap_insert(var)
+        return var
+
+    def add_clause(self, clause):
+        '''
+        Add an input clause. Can be called between solve calls, the learned clauses are kept.
+        After preprocessing, only the frozen variables and new ones can be used.
+        Args:
+            clause ([int]): DIMACS literals
+        Returns:
+            bool: False if the clauses are UNSAT at level 0.
+        '''
+        if self.preprocessor is not None:
+            self.preprocessor.check_frozen(clause)
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        literals = []
+        for literal in clause:
+            while abs(literal) > self.num_vars:
+                self.new_var()
+            literal = encode_literal(literal)
+            if literal ^ 1 in literals:
+                return True  # tautology
+            if literal not in literals:
+                literals.append(literal)
+        for literal in literals:
+            self.var_frequency[literal >> 1] += 1
+            self.vsids_score[literal] += 1
+            if self.use_vsids and self.vsids_heap_index[literal >> 1] != -1:
+                self.heap_sift_up(self.vsids_heap_index[literal >> 1])
+        # simplify with the assignments at level 0
+        unassigned = []
+        for literal in literals:
+            value = self.literal_values[literal]
+            if value == 1:
+                return True
+            if value == -1:
+                unassigned.append(literal)
+        if len(unassigned) == 0:
+            self.ok = False
+            return False
+        clause_id = self.add_clause_to_db(unassigned)
+        self.num_clauses += 1
+        if len(unassigned) == 1:
+            self.assign_implied_var(clause_id, unassigned[0])
         else:
-            # print(literal)
-            result.add(literal)
-    return result
+            self.watch_clause(clause_id)
+        return True
 
-def uip_found(learned_clause):
-    '''
-    UIP (Unit Implication Point) is the point where only one literal in the 
-    learned_clause that is assigned at current decision level.
-    Args:
-        learned_clause ({int}): 
-    Returns:
-        bool: if UIP is found return True.
-    '''
-    count = 0
-    for literal in learned_clause:
-        var = abs(literal)
-        if decision_levels[var] == curr_level:
-            count += 1
-            if count > 1:
-                return False
-    if count == 1:
+    def add_clause_to_db(self, clause):
+        '''
+        Append the clause to the clause arena.
+        Args:
+            clause ([int]): encoded literals
+        Returns:
+            int: id of the clause
+        '''
+        self.clause_start.append(len(self.clause_lits))
+        self.clause_size.append(len(clause))
+        self.clause_lits.extend(clause)
+        self.clause_lbd.append(0)
+        self.clause_activity.append(0.0)
+        clause_id = len(self.clause_start) - 1
+        if self.use_counts:
+            self.sync_counts()
+            self.count_clause(clause_id)
+        return clause_id
+
+    def count_clause(self, clause_id):
+        '''
+        Add a new clause to the occurrence lists and counters, with the current assignments.
+        '''
+        clause = self.get_clause(clause_id)
+        values = self.literal_values
+        true = 0
+        free = 0
+        for literal in clause:
+            self.occurs[literal].append(clause_id)
+            if values[literal] == 1:
+                true += 1
+            elif values[literal] == -1:
+                free += 1
+        self.clause_true.append(true)
+        self.clause_free.append(free)
+        if true == 0:
+            for literal in clause:
+                self.unresolved_count[literal] += 1
+                if free == 2:
+                    self.binary_count[literal] += 1
+
+    def update_counts(self, literal, step):
+        '''
+        Update the counters for the assignment (step 1) or unassignment (step -1) of a literal.
+        Args:
+            literal (int): encoded literal that is true
+            step (int): 1 or -1
+        '''
+        clause_true, clause_free = self.clause_true, self.clause_free
+        unresolved_count, binary_count = self.unresolved_count, self.binary_count
+        for clause_id in self.occurs[literal]:
+            if step == 1:
+                clause_true[clause_id] += 1
+                clause_free[clause_id] -= 1
+                changed = clause_true[clause_id] == 1
+                binary = clause_free[clause_id] == 1
+            else:
+                clause_true[clause_id] -= 1
+                clause_free[clause_id] += 1
+                changed = clause_true[clause_id] == 0
+                binary = clause_free[clause_id] == 2
+            if changed:
+                # the clause becomes SAT, or is not SAT anymore
+                for other in self.get_clause(clause_id):
+                    unresolved_count[other] -= step
+                    if binary:
+                        binary_count[other] -= step
+        for clause_id in self.occurs[literal ^ 1]:
+            free = clause_free[clause_id]
+            clause_free[clause_id] = free - step
+            if clause_true[clause_id] == 0 and (free == 2 or free - step == 2):
+                delta = 1 if free - step == 2 else -1
+                for other in self.get_clause(clause_id):
+                    binary_count[other] += delta
+
+    def sync_counts(self):
+        '''
+        Apply the trail literals that are not counted yet.
+        '''
+        trail = self.trail
+        while self.counted_head < len(trail):
+            self.update_counts(trail[self.counted_head], 1)
+            self.counted_head += 1
+
+    def rebuild_counts(self):
+        '''
+        Recompute the occurrence lists and counters of all clauses, after the clause ids changed.
+        '''
+        self.occurs = [[] for x in range(2*self.num_vars+2)]
+        self.clause_true, self.clause_free = array('i'), array('i')
+        self.unresolved_count = [0] * (2*self.num_vars+2)
+        self.binary_count = [0] * (2*self.num_vars+2)
+        self.counted_head = len(self.trail)
+        for clause_id in range(len(self.clause_start)):
+            self.count_clause(clause_id)
+
+    def get_clause(self, clause_id):
+        '''
+        Args:
+            clause_id (int):
+        Returns:
+            array: encoded literals of the clause
+        '''
+        start = self.clause_start[clause_id]
+        return self.clause_lits[start:start+self.clause_size[clause_id]]
+
+    def get_literal_value(self, literal):
+        '''
+        Args:
+            literal (int): encoded literal
+        Returns:
+            int: Return the value of the literal. Return -1 if unassigned.
+        '''
+        return self.literal_values[literal]
+
+    def get_clause_state(self, clause_id):
+        '''
+        Args:
+            clause_id (int):
+        Returns:
+            string: Return whether the clause is SAT, UNSAT, UNIT_CLAUSE
+                    or (UNRESOLVED, number of unassigned literals)
+        '''
+        values = [self.literal_values[literal] for literal in self.get_clause(clause_id)]
+        if max(values) == 1:
+            return SAT  #SAT
+        unassigned = values.count(-1)
+        if unassigned == 1:
+            return UNIT_CLAUSE
+        elif unassigned > 1:
+            if unassigned == 2:
+                return TWO_CLAUSE
+            else:
+                return (UNRESOLVED, unassigned) #number of unassigned literals
+        else:
+            return UNSAT  #UNSAT
+
+    def get_formula_state(self, formula):
+        '''
+        Args:
+            formula ([int]): clause ids
+        Returns:
+            string: Return whether the formula is SAT, UNSAT or UNRESOLVED.
+        '''
+        for clause_id in formula:
+            value = self.get_clause_state(clause_id)
+            if value == UNSAT:
+                return UNSAT
+            elif value != SAT:
+                return UNRESOLVED
+        return SAT
+
+    def check_formula_state(self, formula):
+        print("\nChecking formula on current assignments:", self.assignments)
+        for clause_id in formula:
+            self.check_clause_state(clause_id)
+        print("Formula state:", self.get_formula_state(formula))
+
+    def check_clause_state(self, clause_id):
+        clause = self.get_clause(clause_id)
+        values = [self.literal_values[literal] for literal in clause]
+        print([decode_literal(literal) for literal in clause], values, self.get_clause_state(clause_id))
+
+    def get_unit_literal(self, unit_clause_id):
+        '''
+        Args:
+            unit_clause_id (int):
+        Returns:
+            int: Return the only unassigned literal in the unit clause.
+        '''
+        for literal in self.get_clause(unit_clause_id):
+            if self.literal_values[literal] == -1:
+                return literal
+
+    def assign_implied_var(self, unit_clause_id, unit_literal):
+        '''
+        Assign value to implied variable, update it's decision level and push it on the trail.
+        Args:
+            unit_clause_id (int): antecedent of the implied variable
+            unit_literal (int): encoded literal
+        '''
+        var = unit_literal >> 1
+        self.assignments[var] = 1 - (unit_literal & 1)
+        self.literal_values[unit_literal] = 1
+        self.literal_values[unit_literal ^ 1] = 0
+        self.antecedents[var] = unit_clause_id
+        self.decision_levels[var] = self.curr_level
+        self.trail.append(unit_literal)
+        if self.debug: print(" > prop assign x{} of value_{} at lvl_{}, in clause {}".format(decode_literal(unit_literal),get_literal_sign(unit_literal), self.curr_level, unit_clause_id))
+
+    def watch_clause(self, clause_id):
+        '''
+        Register the first two literals of the clause in the watch lists. A binary clause goes
+        into the binary implication lists instead, which keep the other literal next to the id.
+        Args:
+            clause_id (int): clause with at least two literals
+        '''
+        start = self.clause_start[clause_id]
+        first, second = self.clause_lits[start], self.clause_lits[start+1]
+        if self.clause_size[clause_id] == 2:
+            self.binaries[first].extend((second, clause_id))
+            self.binaries[second].extend((first, clause_id))
+            return
+        self.watches[first].append(clause_id)
+        self.watches[second].append(clause_id)
+
+    def unit_propagation(self):
+        '''
+        Iterated application of unit clause rule, using two watched literals.
+        Every literal on the trail that has not been propagated yet is processed once, and
+        only the clauses watching its negation are visited. The binary clauses of all trail
+        literals are propagated before the long clauses of the next one, they only need the
+        value of the other literal.
+        Returns:
+            string: Return CONFLICT if UNSAT clause is found. Return None if no conflict.
+        '''
+        lits = self.clause_lits
+        clause_start = self.clause_start
+        clause_size = self.clause_size
+        values = self.literal_values
+        watches = self.watches
+        trail = self.trail
+        assignments = self.assignments
+        antecedents = self.antecedents
+        decision_levels = self.decision_levels
+        level = self.curr_level
+        debug = self.debug
+        binaries = self.binaries
+        binary_head = self.binary_head
+        prop_head = self.prop_head
+        while prop_head < len(trail):
+            while binary_head < len(trail):
+                false_literal = trail[binary_head] ^ 1
+                binary_head += 1
+                implications = binaries[false_literal]
+                if not implications:
+                    continue
+                pairs = iter(implications)
+                for other in pairs:
+                    clause_id = next(pairs)
+                    other_value = values[other]
+                    if other_value == 1:
+                        continue
+                    if other_value == 0:
+                        antecedents[0] = clause_id
+                        decision_levels[0] = level
+                        self.prop_head = prop_head
+                        self.binary_head = binary_head
+                        if debug: print("CONFLICT binary clause", clause_id)
+                        return CONFLICT
+                    self.implication_count += 1
+                    var = other >> 1
+                    assignments[var] = 1 - (other & 1)
+                    values[other] = 1
+                    values[other ^ 1] = 0
+                    antecedents[var] = clause_id
+                    decision_levels[var] = level
+                    trail.append(other)
+                    if debug: print(" > prop assign x{} of value_{} at lvl_{}, in binary clause {}".format(decode_literal(other),get_literal_sign(other), level, clause_id))
+            false_literal = trail[prop_head] ^ 1
+            prop_head += 1
+            if debug: print("> unit_prop on clauses watching", decode_literal(false_literal))
+            watch_list = watches[false_literal]
+            i, j, n = 0, 0, len(watch_list)
+            while i < n:
+                clause_id = watch_list[i]
+                i += 1
+                # keep the falsified watch at the second position
+                start = clause_start[clause_id]
+                first = lits[start]
+                if first == false_literal:
+                    first = lits[start+1]
+                    lits[start] = first
+                    lits[start+1] = false_literal
+                first_value = values[first]
+                if first_value == 1:
+                    watch_list[j] = clause_id
+                    j += 1
+                    continue
+                # look for a new literal to watch
+                for k in range(start+2, start+clause_size[clause_id]):
+                    other = lits[k]
+                    if values[other] != 0:
+                        lits[start+1] = other
+                        lits[k] = false_literal
+                        watches[other].append(clause_id)
+                        break
+                else:
+                    watch_list[j] = clause_id
+                    j += 1
+                    if first_value == 0:
+                        while i < n:
+                            watch_list[j] = watch_list[i]
+                            i += 1
+                            j += 1
+                        del watch_list[j:]
+                        antecedents[0] = clause_id
+                        decision_levels[0] = level
+                        self.prop_head = prop_head
+                        self.binary_head = binary_head
+                        if debug: print("CONFLICT clause", clause_id)
+                        return CONFLICT
+                    self.implication_count += 1
+                    # assign_implied_var(clause_id, first), inlined
+                    var = first >> 1
+                    assignments[var] = 1 - (first & 1)
+                    values[first] = 1
+                    values[first ^ 1] = 0
+                    antecedents[var] = clause_id
+                    decision_levels[var] = level
+                    trail.append(first)
+                    if debug: print(" > prop assign x{} of value_{} at lvl_{}, in clause {}".format(decode_literal(first),get_literal_sign(first), level, clause_id))
+            del watch_list[j:]
+        self.prop_head = prop_head
+        self.binary_head = binary_head
+        if debug: print("unit prop done")
+        return None
+
+    def add_learned_clause(self, learned_clause, lbd):
+        '''
+        Add the learned clause to the clause arena and watch it after backtracking, then assign
+        its unit literal. Literals that are not false are watched first, then the false literals
+        of the highest decision levels, so that the watches stay valid on later backtracking.
+        Args:
+            learned_clause ([int]): encoded literals
+            lbd (int): literal block distance of the clause, computed before backtracking
+        '''
+        self.learned_count += 1
+        self.num_learned += 1
+        if self.proof is not None:
+            self.proof.add(learned_clause)
+        values = self.literal_values
+        decision_levels = self.decision_levels
+        clause = sorted(learned_clause, key=lambda literal: (values[literal] != 0, decision_levels[literal >> 1]), reverse=True)
+        clause_id = self.add_clause_to_db(clause)
+        self.clause_lbd[clause_id] = lbd
+        self.bump_clause_activity(clause_id)
+        if len(clause) > 1:
+            self.watch_clause(clause_id)
+            if values[clause[1]] != 0:
+                return
+        if values[clause[0]] == -1:
+            self.implication_count += 1
+            self.assign_implied_var(clause_id, clause[0])
+
+    def import_clause(self, clause, lbd):
+        '''
+        Add a clause learned by another solver of the same formula, at level 0. It is kept as a
+        learned clause, so reduce_db can delete it again.
+        Args:
+            clause ([int]): encoded literals
+            lbd (int): literal block distance of the clause in the solver that learned it
+        '''
+        unassigned = []
+        for literal in clause:
+            value = self.literal_values[literal]
+            if value == 1:
+                return
+            if value == -1:
+                unassigned.append(literal)
+        if len(unassigned) == 0:
+            self.ok = False
+            return
+        clause_id = self.add_clause_to_db(unassigned)
+        self.clause_lbd[clause_id] = max(1, min(lbd, len(unassigned)))
+        self.num_learned += 1
+        self.imported_count += 1
+        if len(unassigned) == 1:
+            self.assign_implied_var(clause_id, unassigned[0])
+        else:
+            self.watch_clause(clause_id)
+
+    def get_backtrack_level(self, learned_clause):
+        '''
+        Backtrack level is the largest decision levels of the literals in the
+        learned_clause that is smaller than current level. Return -1 if not found.
+        Args:
+            learned_clause [int]:
+        Returns:
+            int: backtrack_level
+        '''
+        if len(learned_clause) == 1:
+            return 0  # backtrack to the start
+        backtrack_level = -1
+        for literal in learned_clause:
+            d = self.decision_levels[literal >> 1]
+            if d > backtrack_level and d < self.curr_level:  #d != curr_level and
+                backtrack_level = d
+        return backtrack_level
+
+    def abstract_level(self, var):
+        '''
+        Args:
+            var (int):
+        Returns:
+            int: bit representing the decision level of the variable, for cheap set tests.
+        '''
+        return 1 << (self.decision_levels[var] & 31)
+
+    def literal_redundant(self, literal, levels):
+        '''
+        A literal of the learned clause is redundant if it is implied by the other literals
+        of the clause, i.e. every path back from it in the implication graph ends in a literal
+        that is in the clause or assigned at level 0.
+        Args:
+            literal (int):
+            levels (int): abstract levels of the literals in the learned clause
+        Returns:
+            bool: if the literal can be removed from the learned clause return True.
+        '''
+        seen, seen_vars = self.seen, self.seen_vars
+        antecedents, decision_levels = self.antecedents, self.decision_levels
+        stack = [literal]
+        top = len(seen_vars)
+        while len(stack) > 0:
+            for other in self.get_clause(antecedents[stack.pop() >> 1]):
+                var = other >> 1
+                if seen[var] or decision_levels[var] == 0:
+                    continue
+                if antecedents[var] != None and self.abstract_level(var) & levels:
+                    seen[var] = True
+                    seen_vars.append(var)
+                    stack.append(other)
+                else:
+                    for var in seen_vars[top:]:
+                        seen[var] = False
+                    del seen_vars[top:]
+                    return False
         return True
-    return False
 
-def get_backtrack_level(learned_clause):
-    '''
-    Backtrack level is the largest decision levels of the literals in the 
-    learned_clause that is smaller than current level. Return -1 if not found.
-    Args:
-        learned_clause {int}: 
-    Returns:
-        int: backtrack_level
-    '''
-    if len(learned_clause) == 1:
-        return 0  # backtrack to the start
-    backtrack_level = -1
-    for literal in learned_clause:
+    def minimize_clause(self, learned_clause):
+        '''
+        Remove the redundant literals of the learned clause. The UIP literal is always kept.
+        Args:
+            learned_clause ([int]):
+        Returns:
+            [int]: minimized learned_clause
+        '''
+        levels = 0
+        for literal in learned_clause[1:]:
+            levels |= self.abstract_level(literal >> 1)
+        minimized = [learned_clause[0]]
+        for literal in learned_clause[1:]:
+            if self.antecedents[literal >> 1] == None or not self.literal_redundant(literal, levels):
+                minimized.append(literal)
+        return minimized
+
+    def conflict_analysis(self):
+        '''
+        Analyze conflict by resolution steps backwards along the trail from the UNSAT clause
+        (that is obtained in unit propagation) until the first UIP is reached, then minimize
+        the learned clause.
+        Returns:
+            [int]: learned_clause, with the UIP literal first
+            int: backtrack_level
+        '''
+        seen, seen_vars, trail = self.seen, self.seen_vars, self.trail
+        decision_levels, curr_level = self.decision_levels, self.curr_level
+        learned_clause = [0]  # learned_clause[0] is reserved for the UIP literal
+        pending = 0  # literals of the current level that are not resolved yet
+        clause_id = self.antecedents[0]  # antecedents[0] is the conflicting unsat clause
+        index = len(trail) - 1
+        while True:
+            if self.debug: print("      resolution with", clause_id)
+            if self.clause_lbd[clause_id] > 0:
+                self.bump_clause_activity(clause_id)
+            for literal in self.get_clause(clause_id):
+                var = literal >> 1
+                if not seen[var] and decision_levels[var] > 0:
+                    seen[var] = True
+                    seen_vars.append(var)
+                    if decision_levels[var] == curr_level:
+                        pending += 1
+                    else:
+                        learned_clause.append(literal)
+            # the next literal to resolve on is the latest seen one on the trail
+            while not seen[trail[index] >> 1]:
+                index -= 1
+            uip = trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause_id = self.antecedents[uip >> 1]
+        learned_clause[0] = uip ^ 1
+        if self.debug: print("uip_found", decode_literal(uip ^ 1))
+
+        learned_clause = self.minimize_clause(learned_clause)
+        for var in seen_vars:
+            seen[var] = False
+        del seen_vars[:]
+
+        backtrack_level = self.get_backtrack_level(learned_clause)
+        if self.debug: print("    return learned_clause, backtrack_level:", [decode_literal(literal) for literal in learned_clause], backtrack_level)
+        return learned_clause, backtrack_level
+
+    def get_lbd(self, clause):
+        '''
+        Args:
+            clause ([int]): assigned literals
+        Returns:
+            int: literal block distance, the number of distinct decision levels in the clause.
+        '''
+        return len(set(self.decision_levels[literal >> 1] for literal in clause))
+
+    def bump_clause_activity(self, clause_id):
+        '''
+        Increase the activity of a learned clause, rescaling all activities if it gets too large.
+        Args:
+            clause_id (int):
+        '''
+        self.clause_activity[clause_id] += self.clause_inc
+        if self.clause_activity[clause_id] > CLAUSE_RESCALE_LIMIT:
+            for i in range(len(self.clause_activity)):
+                self.clause_activity[i] /= CLAUSE_RESCALE_LIMIT
+            self.clause_inc /= CLAUSE_RESCALE_LIMIT
+
+    def clause_locked(self, clause_id):
+        '''
+        Args:
+            clause_id (int):
+        Returns:
+            bool: if the clause is the antecedent of a current assignment return True.
+        '''
+        literal = self.clause_lits[self.clause_start[clause_id]]  # implied literals are always in first position
+        if self.clause_size[clause_id] == 2 and self.antecedents[literal >> 1] != clause_id:
+            literal = self.clause_lits[self.clause_start[clause_id]+1]  # except in binary clauses, they are never reordered
+        return self.literal_values[literal] == 1 and self.antecedents[literal >> 1] == clause_id
+
+    def reduce_db(self):
+        '''
+        Delete the worst half of the learned clauses, ordered by LBD and then by activity.
+        Glue clauses (LBD <= 2) and clauses that are antecedents of current assignments are kept.
+        The clause arena is compacted and the watch lists rebuilt afterwards.
+        '''
+        clause_lbd, clause_activity = self.clause_lbd, self.clause_activity
+        candidates = [clause_id for clause_id in range(len(self.clause_start))
+                      if clause_lbd[clause_id] > GLUE_LBD and not self.clause_locked(clause_id)]
+        candidates.sort(key=lambda clause_id: (-clause_lbd[clause_id], clause_activity[clause_id]))
+        deleted = set(candidates[:len(candidates) // 2])
+        if self.debug: print("reduce_db: delete {} of {} learned clauses".format(len(deleted), self.num_learned))
+        if self.proof is not None:
+            for clause_id in deleted:
+                self.proof.delete(self.get_clause(clause_id))
+
+        new_id = []
+        lits, start, size, lbd, activity = array('i'), array('i'), array('i'), array('i'), []
+        for clause_id in range(len(self.clause_start)):
+            if clause_id in deleted:
+                new_id.append(-1)
+                continue
+            new_id.append(len(start))
+            start.append(len(lits))
+            size.append(self.clause_size[clause_id])
+            lits.extend(self.get_clause(clause_id))
+            lbd.append(clause_lbd[clause_id])
+            activity.append(clause_activity[clause_id])
+        self.clause_lits, self.clause_start, self.clause_size = lits, start, size
+        self.clause_lbd, self.clause_activity = lbd, activity
+        self.num_learned -= len(deleted)
+
+        for literal in self.trail:
+            var = literal >> 1
+            if self.antecedents[var] != None:
+                self.antecedents[var] = new_id[self.antecedents[var]]
+        self.watches = [[] for x in range(2*self.num_vars+2)]
+        self.binaries = [[] for x in range(2*self.num_vars+2)]
+        for clause_id in range(len(self.clause_start)):
+            if self.clause_size[clause_id] > 1:
+                self.watch_clause(clause_id)
+        if self.use_counts:
+            self.rebuild_counts()
+
+    def literal_counts(self, two_clauses_only=False):
+        '''
+        Count the occurrences of the unassigned literals in the clauses that are not SAT.
+        Args:
+            two_clauses_only (bool): only count the clauses with two unassigned literals
+        Returns:
+            dict: {encoded literal: occurrences}
+        '''
+        if self.use_counts:
+            self.sync_counts()
+            count = self.binary_count if two_clauses_only else self.unresolved_count
+            values = self.literal_values
+            return {literal: count[literal] for literal in range(2, 2*self.num_vars+2)
+                    if count[literal] > 0 and values[literal] == -1}
+        counts = {}
+        for clause_id in range(len(self.clause_start)):
+            state = self.get_clause_state(clause_id)
+            if state == SAT or (two_clauses_only and state != TWO_CLAUSE):
+                continue
+            for literal in self.get_clause(clause_id):
+                if self.literal_values[literal] == -1:
+                    counts[literal] = counts.get(literal, 0) + 1
+        return counts
+
+    def var_counts(self, literal_counts):
+        '''
+        Args:
+            literal_counts (dict): {encoded literal: occurrences}
+        Returns:
+            Counter: {variable: occurrences of both of its literals}
+        '''
+        counts = Counter()
+        for literal, count in literal_counts.items():
+            counts[literal >> 1] += count
+        return counts
+
+    def two_clause_heuristic(self):
+        '''
+        Returns:
+            int: proposition with maximum occurrences in 2-clauses, i.e.,
+                clauses with two literals, and break ties randomly.
+        '''
+        unassigned_count = self.var_counts(self.literal_counts(two_clauses_only=True))
+        if len(unassigned_count) == 0:
+            return self.random_heuristic()
+        maxValue = max(unassigned_count.values())
+        variables = [key for key, value in unassigned_count.items() if value == maxValue]
+        return self.random.choice(variables) * self.random.choice([1,-1])
+
+    def DLCS_heuristic(self):
+        '''
+        Returns:
+            int: proposition with maximum occurrences in all UNRESOLVED clauses, break ties randomly,
+                 assigned true if +ve literal count is larger than -ve count, false otherwise.
+        '''
+        unassigned_lit = self.literal_counts()
+        if len(unassigned_lit) == 0:
+            return self.random_heuristic()
+        unassigned_var_count = self.var_counts(unassigned_lit)
+        maxValue = max(unassigned_var_count.values())
+        variables = [key for key, value in unassigned_var_count.items() if value == maxValue]
+        v = self.random.choice(variables)
+        positive, negative = unassigned_lit.get(2*v, 0), unassigned_lit.get(2*v+1, 0)
+        if positive > negative:
+            return v
+        return -v
+
+    def max_freq_heuristic(self):
+        '''
+        Returns:
+            int: unassigned proposition with maximum occurrences in the initial input clauses.
+        '''
+        # Find maximum variable such that variable is unassigned.
+        literal = 0
+        max_freq = -1
+        for x in range(1, self.num_vars+1):
+            if self.assignments[x] == -1 and self.var_frequency[x] > max_freq:
+                max_freq = self.var_frequency[x]
+                literal = x
+        return literal*self.random.choice([1,-1])
+
+    def vsids_key(self, var):
+        '''
+        Args:
+            var (int):
+        Returns:
+            float: priority of the variable in the VSIDS heap, the score of its best literal.
+        '''
+        return max(self.vsids_score[2*var], self.vsids_score[2*var+1])
+
+    def heap_sift_up(self, pos):
+        heap, index, key_of = self.vsids_heap, self.vsids_heap_index, self.vsids_key
+        var = heap[pos]
+        key = key_of(var)
+        while pos > 0:
+            parent = (pos - 1) >> 1
+            if key_of(heap[parent]) >= key:
+                break
+            heap[pos] = heap[parent]
+            index[heap[pos]] = pos
+            pos = parent
+        heap[pos] = var
+        index[var] = pos
+
+    def heap_sift_down(self, pos):
+        heap, index, key_of = self.vsids_heap, self.vsids_heap_index, self.vsids_key
+        var = heap[pos]
+        key = key_of(var)
+        size = len(heap)
+        while True:
+            child = 2 * pos + 1
+            if child >= size:
+                break
+            if child + 1 < size and key_of(heap[child+1]) > key_of(heap[child]):
+                child += 1
+            if key_of(heap[child]) <= key:
+                break
+            heap[pos] = heap[child]
+            index[heap[pos]] = pos
+            pos = child
+        heap[pos] = var
+        index[var] = pos
+
+    def heap_insert(self, var):
+        '''
+        Insert the variable into the VSIDS heap, if it is not already in it.
+        Args:
+            var (int):
+        '''
+        if self.vsids_heap_index[var] != -1:
+            return
+        self.vsids_heap.append(var)
+        self.heap_sift_up(len(self.vsids_heap) - 1)
+
+    def heap_pop(self):
+        '''
+        Returns:
+            int: variable with the highest VSIDS key, removed from the heap.
+        '''
+        heap = self.vsids_heap
+        top = heap[0]
+        last = heap.pop()
+        self.vsids_heap_index[top] = -1
+        if len(heap) > 0:
+            heap[0] = last
+            self.heap_sift_down(0)
+        return top
+
+    def update_vsids(self):
+        '''
+        Bump the literals of the conflict clause. Instead of decaying every score, the bump
+        increment grows after each conflict, and all scores are rescaled when it gets too large.
+        '''
+        for literal in self.get_clause(self.antecedents[0]):  #antecedents[0] is the conflict clause
+            self.vsids_score[literal] += self.vsids_inc
+            pos = self.vsids_heap_index[literal >> 1]
+            if pos != -1:
+                self.heap_sift_up(pos)
+        self.vsids_inc /= VSIDS_DECAY
+        if self.vsids_inc > VSIDS_RESCALE_LIMIT:
+            # rescaling keeps the order of the scores, so the heap stays valid
+            for literal in range(len(self.vsids_score)):
+                self.vsids_score[literal] /= VSIDS_RESCALE_LIMIT
+            self.vsids_inc /= VSIDS_RESCALE_LIMIT
+
+    def vsids_heuristic(self):
+        '''
+        Returns:
+            int: unassigned literal with the highest VSIDS score.
+        '''
+        var = self.heap_pop()
+        while self.assignments[var] != -1:  # assigned variables are removed lazily
+            var = self.heap_pop()
+        if self.vsids_score[2*var] > self.vsids_score[2*var+1]:
+            return var
+        return -var
+
+    def random_heuristic(self):
+        '''
+        Returns:
+            int: randomly chosen unassigned proposition
+        '''
+        if(len(self.inputs) > 0):
+            return self.inputs.pop(0)
+        unassigned = [x for x in range(1, self.num_vars+1) if self.assignments[x] == -1]
+        return self.random.choice(unassigned) * self.random.choice([1,-1])
+
+    def no_restart(self):
+        '''
+        Returns:
+            bool: never restart.
+        '''
+        return False
+
+    def luby_restart(self):
+        '''
+        Returns:
+            bool: restart after LUBY_UNIT times the next Luby number of conflicts.
+        '''
+        return self.conflicts_since_restart >= LUBY_UNIT * luby(self.restart_count)
+
+    def geometric_restart(self):
+        '''
+        Returns:
+            bool: restart after a number of conflicts that grows geometrically.
+        '''
+        return self.conflicts_since_restart >= GEOMETRIC_FIRST * GEOMETRIC_GROWTH ** self.restart_count
+
+    def glucose_restart(self):
+        '''
+        Returns:
+            bool: restart when the average LBD of the recently learned clauses is high compared
+                  to the average LBD of all learned clauses, i.e. the search is not progressing.
+        '''
+        return len(self.recent_lbd) == GLUCOSE_WINDOW and self.recent_lbd_sum / GLUCOSE_WINDOW * GLUCOSE_K > self.lbd_sum / self.conflict_count
+
+    def update_lbd_averages(self, lbd):
+        '''
+        Add the LBD of a new learned clause to the averages used by the glucose restart.
+        Args:
+            lbd (int):
+        '''
+        self.lbd_sum += lbd
+        if len(self.recent_lbd) == GLUCOSE_WINDOW:
+            self.recent_lbd_sum -= self.recent_lbd[0]
+        self.recent_lbd.append(lbd)
+        self.recent_lbd_sum += lbd
+
+    def restart(self):
+        '''
+        Backtrack to level 0, keeping the learned clauses.
+        '''
+        if self.debug: print("restart #{} after {} conflicts".format(self.restart_count+1, self.conflicts_since_restart))
+        self.backtrack(0)
+        self.restart_count += 1
+        self.conflicts_since_restart = 0
+        self.recent_lbd.clear()
+        self.recent_lbd_sum = 0
+        self.target_size = 0  # the next conflict free trail becomes the target, the best phase stays
+        if self.exchange is not None:
+            for clause, lbd in self.exchange.import_clauses():
+                self.import_clause(clause, lbd)
+                if not self.ok:
+                    break
+
+    def pick_branching_variable(self):
+        '''
+        Returns:
+            int: picked decision variable and it's assignemnt value
+                (positive if assign to True, negative if assign to False)
+        '''
+        return self.heuristic()
+
+    def pick_phase(self, literal):
+        '''
+        Args:
+            literal (int): DIMACS decision literal of the heuristic
+        Returns:
+            int: the encoded decision literal, with the target or saved phase of its variable
+                if phase_mode uses them and it has one
+        '''
         var = abs(literal)
-        d = decision_levels[var]
-        if d > backtrack_level and d < curr_level:  #d != curr_level and 
-            backtrack_level = d
-    return backtrack_level
+        if self.phase_mode == "target" and self.target_phase[var] != -1:
+            return 2*var + self.target_phase[var]
+        if self.phase_mode != "heuristic" and self.saved_phase[var] != -1:
+            return 2*var + self.saved_phase[var]
+        return encode_literal(literal)
+
+    def update_target_phase(self):
+        '''
+        Called on a conflict, before backtracking. The trail below the conflict level has no
+        conflict, if it is the longest one since the last restart its values become the target
+        phase, and the best phase too if it is also the longest one since the last rephase.
+        '''
+        size = self.trail_lim[self.curr_level-1]
+        if size <= self.target_size:
+            return
+        self.target_size = size
+        for literal in self.trail[:size]:
+            self.target_phase[literal >> 1] = literal & 1
+        if size > self.best_size:
+            self.best_size = size
+            for literal in self.trail[:size]:
+                self.best_phase[literal >> 1] = literal & 1
+
+    def rephase(self):
+        '''
+        Reset the saved phases, in turn to the best phase, to the heuristic's choice (no saved
+        phase), to the best phase again and to random values, so that the search leaves an
+        area where the same partial assignment keeps coming back.
+        '''
+        kind = REPHASE_ORDER[self.rephase_count % len(REPHASE_ORDER)]
+        if self.debug: print("rephase #{} to {} phases".format(self.rephase_count+1, kind))
+        for var in range(1, self.num_vars+1):
+            if kind == "best":
+                if self.best_phase[var] != -1:
+                    self.saved_phase[var] = self.best_phase[var]
+            elif kind == "original":
+                self.saved_phase[var] = -1
+            else:
+                self.saved_phase[var] = self.random.getrandbits(1)
+            self.target_phase[var] = -1
+        self.target_size = 0
+        self.best_size = 0
+        self.rephase_count += 1
+        self.next_rephase = self.conflict_count + REPHASE_INTERVAL * (self.rephase_count + 1)
+
+    def all_var_assigned(self):
+        '''
+        Returns:
+            bool: if all variables are assigned return True.
+        '''
+        return len(self.trail) == self.num_vars
+
+    def new_decision_level(self):
+        '''
+        Mark the start of a new decision level on the trail.
+        '''
+        self.trail_lim.append(len(self.trail))
+        self.curr_level += 1
+
+    def assign_decision_var(self, decision_literal):
+        '''
+        Assign value to decision variable in a new decision level.
+        Args:
+            decision_literal (int): encoded literal
+        '''
+        self.new_decision_level()
+        var = decision_literal >> 1
+        self.assignments[var] = get_literal_sign(decision_literal)
+        self.literal_values[decision_literal] = 1
+        self.literal_values[decision_literal ^ 1] = 0
+        # antecedents[var] = None
+        self.decision_levels[var] = self.curr_level
+        self.trail.append(decision_literal)
+        if self.debug: print("\ndec assign x{} of value_{} at lvl_{}".format(decode_literal(decision_literal),get_literal_sign(decision_literal), self.curr_level))
+
+    def backtrack(self, backtrack_level):
+        '''
+        Remove assignments of variables that were assigned at higher than the backtrack level,
+        by popping the trail back to the start of level backtrack_level+1.
+        Args:
+            backtrack_level (int):
+        '''
+        if self.curr_level <= backtrack_level:
+            return
+        trail = self.trail
+        level_start = self.trail_lim[backtrack_level]
+        if self.use_counts:
+            while self.counted_head > level_start:
+                self.counted_head -= 1
+                self.update_counts(trail[self.counted_head], -1)
+        assignments, values = self.assignments, self.literal_values
+        antecedents, decision_levels = self.antecedents, self.decision_levels
+        use_vsids, saved_phase = self.use_vsids, self.saved_phase
+        for literal in trail[level_start:]:
+            var = literal >> 1
+            saved_phase[var] = literal & 1
+            assignments[var] = -1
+            values[literal] = -1
+            values[literal ^ 1] = -1
+            antecedents[var] = None
+            decision_levels[var] = -1
+            if use_vsids:
+                self.heap_insert(var)
+        del trail[level_start:]
+        del self.trail_lim[backtrack_level:]
+        self.prop_head = level_start
+        self.binary_head = level_start
+        self.curr_level = backtrack_level
+
+    def solve(self, assumptions=[]):
+        '''
+        Solve the clauses added so far. The assumption literals are decided first, in order,
+        and only hold for this call; the learned clauses are kept for later calls.
+        If the result is UNSAT, failed_assumptions() gives the assumptions that caused it.
+        After preprocessing, only the frozen variables and new ones can be assumed.
+        Args:
+            assumptions ([int]): DIMACS literals
+        Returns:
+            string: SAT, UNSAT or TIMEOUT
+        '''
+        if self.preprocessor is not None:
+            self.preprocessor.check_frozen(assumptions)
+        start_time = time.time() - self.setup_time  # the timeout and time_taken include the preprocessing
+        self.setup_time = 0
+        self.model_values = None
+        self.conflict_core = []
+        for literal in assumptions:
+            while abs(literal) > self.num_vars:
+                self.new_var()
+        if self.ok:
+            sat_result = self.solveCDCL([encode_literal(literal) for literal in assumptions], start_time)
+        else:
+            sat_result = UNSAT
+        if sat_result == SAT:
+            self.model_values = list(self.assignments)
+        if sat_result != UNSAT:
+            self.conflict_core = None
+        if not self.ok and self.proof is not None:
+            self.proof.add([])  # the empty clause ends the refutation
+        self.backtrack(0)
+        self.time_taken = float("{:.6f}".format(time.time() - start_time))
+        self.total_time += self.time_taken
+        return sat_result
+
+    def solveCDCL(self, assumptions, start_time):
+        '''
+        Args:
+            assumptions ([int]): encoded literals
+            start_time (float):
+        Returns:
+            string: SAT, UNSAT or TIMEOUT
+        '''
+        profile = self.profile
+        while True:
+            if profile: phase_start = time.perf_counter()
+            state = self.unit_propagation()
+            if profile: self.add_phase_time("propagate", phase_start)
+            if state == CONFLICT:
+                if self.curr_level == 0:
+                    self.ok = False
+                    return UNSAT
+                self.conflict_count += 1
+                self.conflicts_since_restart += 1
+                if profile: phase_start = time.perf_counter()
+                if self.use_vsids: self.update_vsids()
+                learned_clause, b = self.conflict_analysis()
+                if b < 0:
+                    self.ok = False
+                    return UNSAT
+                lbd = self.get_lbd(learned_clause)
+                self.update_lbd_averages(lbd)
+                if self.phase_mode == "target": self.update_target_phase()
+                if profile:
+                    self.add_phase_time("analyze", phase_start)
+                    self.learned_sizes[len(learned_clause)] += 1
+                    if self.conflict_count % PROGRESS_INTERVAL == 0:
+                        print(self.progress_line(time.time() - start_time))
+                    phase_start = time.perf_counter()
+                self.backtrack(b)
+                if profile: self.add_phase_time("backtrack", phase_start)
+                self.add_learned_clause(learned_clause, lbd)
+                if self.exchange is not None: self.exchange.export_clause(learned_clause, lbd)
+                self.clause_inc /= CLAUSE_DECAY
+                continue
+
+            if time.time() - start_time > self.timeout:
+                return TIMEOUT
+            if self.conflict_count >= self.next_reduce:
+                if profile: phase_start = time.perf_counter()
+                self.reduce_db()
+                if profile: self.add_phase_time("reduce", phase_start)
+                self.reduce_interval *= REDUCE_GROWTH
+                self.next_reduce = self.conflict_count + self.reduce_interval
+            if self.phase_mode != "heuristic" and self.conflict_count >= self.next_rephase:
+                self.rephase()
+            if self.curr_level > len(assumptions) and self.restart_strategy():
+                if profile: phase_start = time.perf_counter()
+                self.restart()
+                if profile: self.add_phase_time("restart", phase_start)
+                if not self.ok:
+                    return UNSAT
+                continue
 
-def conflict_analysis():
+            if profile: phase_start = time.perf_counter()
+            decision_literal = None
+            while self.curr_level < len(assumptions):
+                literal = assumptions[self.curr_level]
+                value = self.literal_values[literal]
+                if value == 1:
+                    self.new_decision_level()  # already satisfied, keep one level per assumption
+                elif value == 0:
+                    self.conflict_core = self.analyze_final(literal)
+                    return UNSAT
+                else:
+                    decision_literal = literal
+                    break
+            if decision_literal == None:
+                if self.all_var_assigned():
+                    return SAT
+                decision_literal = self.pick_phase(self.pick_branching_variable())
+                self.branching += 1
+            self.assign_decision_var(decision_literal)
+            if profile: self.add_phase_time("decide", phase_start)
+
+    def add_phase_time(self, phase, phase_start):
+        '''
+        Args:
+            phase (string): one of PHASES
+            phase_start (float): time.perf_counter() at the start of the phase
+        '''
+        self.phase_time[phase] += time.perf_counter() - phase_start
+        self.phase_calls[phase] += 1
+
+    def progress_line(self, elapsed):
+        '''
+        Args:
+            elapsed (float): seconds since the start of the solve call
+        Returns:
+            string: one line of search progress, printed every PROGRESS_INTERVAL conflicts if profile
+        '''
+        elapsed = max(elapsed, 1e-9)
+        return "c {:.1f}s: {} conflicts, {} decisions, {} restarts, {} learned clauses in the database, {:.0f} conflicts/s, {:.0f} propagations/s".format(
+            elapsed, self.conflict_count, self.branching, self.restart_count, self.num_learned,
+            self.conflict_count / elapsed, self.implication_count / elapsed)
+
+    def learned_histogram(self):
+        '''
+        Returns:
+            dict: {length range: number of learned clauses}, in LEARNED_SIZE_BUCKETS ranges, if profile
+        '''
+        histogram = {}
+        low = 1
+        for high in LEARNED_SIZE_BUCKETS:
+            histogram["{}-{}".format(low, high) if high > low else str(low)] = sum(
+                count for size, count in self.learned_sizes.items() if low <= size <= high)
+            low = high + 1
+        histogram["{}+".format(low)] = sum(count for size, count in self.learned_sizes.items() if size >= low)
+        return histogram
+
+    def analyze_final(self, literal):
+        '''
+        Find the assumptions that imply the negation of the assumption literal, by walking
+        back the trail through the antecedents. Only assumptions are decided at this point,
+        so every decision reached is a failed assumption.
+        Args:
+            literal (int): encoded assumption literal that is false
+        Returns:
+            [int]: DIMACS literals of the failed assumptions, including literal
+        '''
+        core = [decode_literal(literal)]
+        if self.curr_level == 0 or self.decision_levels[literal >> 1] == 0:
+            return core
+        seen, antecedents, decision_levels = self.seen, self.antecedents, self.decision_levels
+        seen[literal >> 1] = True
+        for index in range(len(self.trail)-1, self.trail_lim[0]-1, -1):
+            var = self.trail[index] >> 1
+            if not seen[var]:
+                continue
+            if antecedents[var] == None:
+                core.append(decode_literal(self.trail[index]))
+            else:
+                for other in self.get_clause(antecedents[var]):
+                    if decision_levels[other >> 1] > 0:
+                        seen[other >> 1] = True
+            seen[var] = False
+        seen[literal >> 1] = False
+        return core
+
+    def failed_assumptions(self):
+        '''
+        Returns:
+            [int]: Return the subset of the assumptions of the last solve call that made it UNSAT.
+                   It is empty if the clauses are UNSAT without assumptions, and None if the
+                   result was not UNSAT.
+        '''
+        return self.conflict_core
+
+    def model(self):
+        '''
+        Returns:
+            [int]: Return the DIMACS literals of the model found by the last solve call.
+                   Return None if it was not SAT.
+        '''
+        if self.model_values == None:
+            return None
+        model = [var if self.model_values[var] == 1 else -var for var in range(1, len(self.model_values))]
+        if self.preprocessor is not None:
+            return self.preprocessor.extend_model(model)
+        return model
+
+    def stats(self):
+        '''
+        Returns:
+            dict: counters of the solver, accumulated over all solve calls, except time which is
+                the time of the last call
+        '''
+        return {"variables": self.num_vars, "clauses": self.num_clauses, "time": self.time_taken,
+                "branches": self.branching, "implications": self.implication_count,
+                "conflicts": self.conflict_count, "learned": self.learned_count,
+                "restarts": self.restart_count, "imported": self.imported_count,
+                "heuristic": self.heuristic.__name__,
+                "restart": self.restart_strategy.__name__,
+                "preprocess": None if self.preprocessor is None else self.preprocessor.stats(),
+                "conflicts_per_sec": self.conflict_count / max(self.total_time, 1e-6),
+                "propagations_per_sec": self.implication_count / max(self.total_time, 1e-6),
+                "phases": {phase: (self.phase_calls[phase], self.phase_time[phase]) for phase in PHASES} if self.profile else None,
+                "learned_histogram": self.learned_histogram() if self.profile else None}
+
+def new_solver(num_vars, clauses, heuristic="VSIDS", restart="luby", phase=None, timeout=None, seed=None, frozen=[], proof=None, profile=False, debug=False):
     '''
-    Analyze conflict by resolution steps backwards from the UNSAT clause 
-    (that is obtained in unit propagation) until UIP is reached.
+    Create a solver with the clauses, preprocessed first if use_preprocessing is set. The
+    preprocessing stops at the timeout and its time is counted in the first solve call.
+    Args:
+        heuristic (string): a key of heuristics, or a local search algorithm of local_search_list
+        frozen ([int]): variables kept by the preprocessing. Later clauses and assumptions can only
+            use these and new variables, the others raise ValueError
+        proof (DratWriter): gets the DRAT proof of the preprocessing and of the search
+        the other arguments are the ones of CDCLSolver
     Returns:
-        {int}: learned_clause
-        int: backtrack_level
+        CDCLSolver, or LocalSearchSolver for a local search algorithm
     '''
-    # print("\n", curr_level, antecedents, decision_levels, "\n")
-    queue = [0]  # special node antecedents[0] is the conflicting unsat clause 
-    seen = set()
-    learned_clause = set()
-    while len(queue) > 0:
-        if debug: print("    queue", queue)
-        if (not learned_clause in learned_clauses) and uip_found(learned_clause):
-            if debug: print("uip_found")
-            break
-        k = queue.pop(0)
-        seen.add(k)
-        clause = antecedents[k]
-        if debug: print("      resolution with", clause)
-        learned_clause = resolution_of(learned_clause, clause)
-        if debug: print("      get learned_clause", learned_clause)
-        for literal in learned_clause:
-            var = abs(literal)
-            if decision_levels[var] == curr_level and antecedents[var] != None and var not in queue: # and var not in seen:  #added seen to prevent non-stop loop in resolution
-                queue.append(var)
-                if debug: print("      append var", var)
-    if uip_found(learned_clause): #debug statement: learned clause must be UIP
-        if debug: print("UIP learned clause")
+    if heuristic in local_search_list:
+        import local_search
+        solver = local_search.LocalSearchSolver(num_vars, algorithm=heuristic, timeout=timeout, seed=seed, debug=debug)
     else:
-        if debug: print("NOT UIP learned clause")
-    backtrack_level = get_backtrack_level(learned_clause)
-    if debug: print("    return learned_clause, backtrack_level:", learned_clause, backtrack_level)
-    return frozenset(learned_clause), backtrack_level
+        solver = CDCLSolver(num_vars, heuristic=heuristic, restart=restart, phase=phase, timeout=timeout, seed=seed, profile=profile, debug=debug)
+    solver.proof = proof
+    preprocessor = None
+    if use_preprocessing:
+        import preprocess
+        preprocessor = preprocess.Preprocessor(num_vars, clauses, frozen=frozen, proof=proof, timeout=solver.timeout, debug=debug)
+        preprocessor.run()
+        solver.setup_time = preprocessor.time_taken
+        clauses = preprocessor.get_clauses()
+    for clause in clauses:
+        solver.add_clause(clause)
+    solver.preprocessor = preprocessor  # set after the simplified clauses, which may use any variable
+    return solver
 
-def two_clause_heuristic():
-    '''
-    Returns: 
-        int: proposition with maximum occurrences in 2-clauses, i.e., 
-            clauses with two literals, and break ties randomly.
-    '''
-    unassigned = []
-    for clause in clauses.union(learned_clauses):
-        state = get_clause_state(clause)
-        if state == TWO_CLAUSE:
-            for literal in clause:
-                if get_literal_value(literal) == -1:
-                    unassigned.append(abs(literal))
-    if len(unassigned) == 0:
-        return random_heuristic()
-    unassigned_count = Counter(unassigned)
-    maxValue = max(unassigned_count.values())
-    variables = [key for key, value in unassigned_count.items() if value == maxValue]
-    return random.choice(variables) * random.choice([1,-1])
-
-# def not_rand_two_clause_heuristic():
-#     '''
-#     Returns: 
-#         int: proposition with maximum occurrences in 2-clauses, i.e., 
-#             clauses with two literals, and break ties randomly.
-#     '''
-#     unassigned = []
-#     unassigned_lit = {}
-#     for clause in clauses.union(learned_clauses):
-#         state = get_clause_state(clause)
-#         if state == TWO_CLAUSE:
-#             for literal in clause:
-#                 if get_literal_value(literal) == -1:
-#                     unassigned.append(abs(literal))
-#                     if literal not in unassigned_lit:
-#                         unassigned_lit[literal] = 0
-#                     unassigned_lit[literal] += 1
-#     if len(unassigned) == 0:
-#         return random_heuristic()
-#     unassigned_count = Counter(unassigned)
-#     maxValue = max(unassigned_count.values())
-#     variables = [key for key, value in unassigned_count.items() if value == maxValue]
-
-#     v = random.choice(variables)
-#     if abs(v) not in unassigned_lit:
-#         lit = -abs(v)
-#     elif -abs(v) not in unassigned_lit:
-#         lit = abs(v)
-#     elif unassigned_lit[abs(v)] > unassigned_lit[-abs(v)]:
-#         lit = abs(v)
-#     else:
-#         lit = -abs(v) 
-#     # return random.choice(variables) * random.choice([1,-1])
-#     return lit
-
-def DLCS_heuristic():
+def initialize_and_run_solver(show_result=True):
     '''
-    Returns: 
-        int: proposition with maximum occurrences in all UNRESOLVED clauses, break ties randomly,
-             assigned true if +ve literal count is larger than -ve count, false otherwise.
+    Run a new solver on the clauses read by get_read_input(), with the selected heuristic
+    and restart strategy.
+    Returns:
+        sat_result, time_taken, branching, implication_count, restart_count
     '''
-    unassigned_var = []
-    unassigned_lit = {}
-    for clause in clauses.union(learned_clauses):
-        state = get_clause_state(clause)
-        if state != SAT and clause != UNSAT:
-            for literal in clause:
-                if get_literal_value(literal) == -1:
-                    unassigned_var.append(abs(literal))
-                    if literal not in unassigned_lit:
-                        unassigned_lit[literal] = 0
-                    unassigned_lit[literal] += 1
-    # literals =  max(unassigned_var,key=unassigned_var.count)
-    if len(unassigned_var) == 0:
-        return random_heuristic()
-    unassigned_var_count = Counter(unassigned_var)
-    maxValue = max(unassigned_var_count.values())
-    variables = [key for key, value in unassigned_var_count.items() if value == maxValue]
-    v = random.choice(variables)
-    if abs(v) not in unassigned_lit:
-        lit = -abs(v)
-    elif -abs(v) not in unassigned_lit:
-        lit = abs(v)
-    elif unassigned_lit[abs(v)] > unassigned_lit[-abs(v)]:
-        lit = abs(v)
-    else:
-        lit = -abs(v) 
-    # return random.choice(variables) * random.choice([1,-1])
-    return lit
-
-def get_var_freq():
-    # variable frequency in initial set of input clauses
-    global var_frequency
-    if len(var_frequency) == 0:
-        var_frequency = {x:0 for x in range(1, len(assignments))}
-        for clause in clauses:
-            for literal in clause:
-                var_frequency[abs(literal)] += 1
+    proof = open_proof(input_cnf, heuristic) if write_proof else None
+    solver = new_solver(num_vars, clauses, heuristic=heuristic, restart=restart, proof=proof, profile=debug, debug=debug)
+    sat_result = solver.solve()
+    if proof is not None:
+        proof.close()
+        if sat_result == UNSAT:
+            print("DRAT proof written to", proof.path)
 
-def max_freq_heuristic():
-    '''
-    Returns: 
-        int: unassigned proposition with maximum occurrences in the initial input clauses.
-    '''
-    global var_frequency
-    if len(var_frequency) == 0:
-        get_var_freq()
-    # Find maximum variable such that variable is unassigned.
-    literal = 0
-    max_freq = -1
-    for x in range(1, len(assignments)):
-        # print(x)
-        if assignments[x] == -1 and var_frequency[x] > max_freq:
-            max_freq = var_frequency[x]
-            literal = x
-    return literal*random.choice([1,-1])
-
-def vsids_init():
-    vsids_score = {x:0 for x in range(-num_vars, num_vars+1)}
-    for clause in clauses:
-        for literal in clause:
-            vsids_score[literal] += 1
-    return vsids_score
-
-def update_vsids():
-    global conflict_count, vsids_score
-    conflict_count += 1
-    for literal in antecedents[0]:  #antecedents[0] is the conflict clause
-        vsids_score[literal] += 1
-    if conflict_count % 256 == 0:
-        # half score every 256 conflicts (decay score to give priority to recently learned clause)
-        for literal in range(-num_vars, num_vars+1):
-            vsids_score[literal] = vsids_score[literal]/2
-    # sort priority queue after each decay only
-
-def vsids_heuristic():
-    global vsids_score
-    literal = 0
-    max_score = -1
-    for x in range(-num_vars, num_vars+1):
-        if assignments[abs(x)] == -1 and vsids_score[x] > max_score:
-            max_score = vsids_score[x] 
-            literal = x
-    return literal
-
-def random_heuristic():
-    '''
-    Returns: 
-        int: randomly chosen unassigned proposition 
-    '''
-    global inputs
-    if(len(inputs) > 0):
-        return inputs.pop(0)
-    unassigned = [x for x in range(1, len(assignments)) if assignments[x] == -1]
-    return random.choice(unassigned) * random.choice([1,-1])
+    if show_result:
+        print_and_write_output(solver, sat_result)
 
-def pick_branching_variable():
+    return sat_result, solver.time_taken, solver.branching, solver.implication_count, solver.restart_count
+
+def open_proof(cnf_file, heuristic, directory=None):
     '''
+    Args:
+        cnf_file (string): input cnf file
+        heuristic (string): the heuristic of the run, part of the proof name so that the runs
+            of one file do not overwrite each other's proof
+        directory (string): created if it does not exist, default output_path
     Returns:
-        int: picked decision variable and it's assignemnt value
-            (positive if assign to True, negative if assign to False)
+        DratWriter: writing to <directory><cnf name>.<heuristic>.drat
     '''
-    return heuristic()
+    import proof
+    directory = output_path if directory is None else directory
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    return proof.DratWriter(os.path.join(directory, "{}.{}.drat".format(os.path.basename(cnf_file), heuristic)))
 
-def all_var_assigned():
+def initialize_and_run_parallel(mode, show_result=True):
     '''
+    Run the clauses read by get_read_input() on all cpus, either racing all heuristics with
+    several seeds each ("portfolio"), or splitting the formula into cubes ("cube"). No DRAT
+    proof is written in these modes.
     Returns:
-        bool: if all variables are assigned return True.
+        sat_result, time_taken
     '''
-    return not (-1 in assignments[1:])
+    if mode == "portfolio":
+        import portfolio
+        solver = portfolio.Portfolio(num_vars, restart=restart, debug=debug)
+    else:
+        import cube
+        solver = cube.CubeSolver(num_vars, restart=restart, debug=debug)
+    for clause in clauses:
+        solver.add_clause(clause)
+    sat_result = solver.solve()
+    if mode == "portfolio":
+        print("Portfolio winner:", solver.winner)
+
+    if show_result:
+        print_and_write_output(solver, sat_result)
 
-def assign_decision_var(decision_var):
+    return sat_result, solver.time_taken
+
+def verify_model(clauses, model):
     '''
-    Assign value to decision variable, update it's decision level.
     Args:
-        decision_var (int):
+        clauses ([[int]]): DIMACS clauses
+        model ([int]): DIMACS literals
+    Returns:
+        bool: if every clause has a literal of the model return True.
     '''
-    global curr_level, assignments, decision_levels
-    var = abs(decision_var)
-    assignments[var] = get_literal_sign(decision_var)
-    # antecedents[var] = None
-    decision_levels[var] = curr_level
-    if debug: print("\ndec assign x{} of value_{} at lvl_{}".format(decision_var,get_literal_sign(decision_var), curr_level))
-
+    if model == None:
+        return False
+    model = set(model)
+    for clause in clauses:
+        if model.isdisjoint(clause):
+            return False
+    return True
 
-def backtrack(backtrack_level):
+def verify_models(clauses, models):
     '''
-    Remove assignments of variables that were assigned at higher than the backtrack level.
+    Check many models of the same clauses at once, in one batch with evaluator.py if numpy
+    is installed, else one by one with verify_model().
     Args:
-        backtrack_level (int):
+        clauses ([[int]]): DIMACS clauses
+        models ([[int]]): DIMACS literals of each model
+    Returns:
+        [bool]: True for each model that satisfies every clause
     '''
-    global assignments, antecedents, decision_levels
-    for var in range(len(assignments)):
-        if decision_levels[var] > backtrack_level:
-            assignments[var] = -1
-            antecedents[var] = None
-            decision_levels[var] = -1
-
-def solveCDCL():
-    global curr_level, learned_clauses, assignments, antecedents, decision_levels, branching, var_frequency
-    curr_level = 0
-    if unit_propagation() == CONFLICT:
-        return UNSAT
-    branching = 0
-    while not all_var_assigned():
-        if time.time() - start_time > timeout_limit:
-            return TIMEOUT
-        dec_var = pick_branching_variable() #random_heuristic() #two_clause_heuristic() #max_occurence_heuristic() 
-        branching += 1
-        curr_level += 1
-        # if branching > 60:
-        #   break
-        assign_decision_var(dec_var)
-        while unit_propagation() == CONFLICT:
-            if heuristic.__name__ == "vsids_heuristic": update_vsids()
-            learned_clause, b = conflict_analysis()
-            if b < 0:
-                return UNSAT
-            learned_clauses.add(learned_clause)
-            backtrack(b)
-            curr_level = b
-    return SAT
+    import evaluator
+    if evaluator.np is None or len(models) == 0 or None in models:
+        return [verify_model(clauses, model) for model in models]
+    num_vars = max([abs(literal) for model in models for literal in model] + [0])
+    matrix = evaluator.FormulaMatrix(clauses, num_vars)
+    assignments = [evaluator.assignment_vector(model, matrix.num_vars) for model in models]
+    return [bool(satisfied) for satisfied in matrix.check_models(assignments)]
 
-def initialize_and_run_solver(show_result=True):
-    global curr_level, branching, implication_count, conflict_count
-    global learned_clauses, assignments, antecedents, decision_levels
-    global var_frequency, vsids_score
-    global debug, inputs, clauses 
-    global start_time, time_taken
-
-    curr_level = 0
-    branching = 0
-    implication_count = 0
-    conflict_count = 0
-
-    learned_clauses = set()
-    assignments = [-1] * (num_vars+1)
-    antecedents =  [None] * (num_vars+1)  # List of clauses
-    decision_levels = [-1] * (num_vars+1)
-
-    var_frequency = {}
-    vsids_score = vsids_init()
-
-    inputs = []  # for debug purpose: by specifying pick sequence in random heuristic
-    # print("clauses", clauses)
-    # print("\n", curr_level, learned_clauses, assignments, antecedents, decision_levels, "\n")
-
-    start_time = time.time()
-    sat_result = solveCDCL()
-    end_time = time.time()
-    time_taken = float("{:.6f}".format(end_time - start_time))
-    # print(sat_result)
-    # print("\n", curr_level, branching, learned_clauses, assignments, antecedents, decision_levels, "\n")
-
-    if show_result:
-        print_and_write_output(sat_result)
-
-    return sat_result, time_taken, branching, implication_count
-
-def print_and_write_output(sat_result):
+def print_and_write_output(solver, sat_result):
     # sat_result can be SAT/UNSAT/TIMEOUT
     output_assignments = "None"
     if sat_result == SAT:
-        output_assignments = []
-        for i, x in enumerate(assignments[1:]):
-            j = i+1
-            if x == 0:
-                output_assignments.append(-j)
-            else:
-                output_assignments.append(j)
+        output_assignments = solver.model()
     verified_result = "None"
     
+    if sat_result == SAT:
+        # SAT answers are checked against the input clauses
+        if verify_model(clauses, output_assignments):
+            verified_result = "Correct"
+            print("Correct!")
+        else:
+            verified_result = "Wrong"
+            print("ERRORRRRR")
+            return 
     if is_known_solution: 
-        if sat_result == SAT:
-            if "sat" in input_cnf:
-                verified_result = "Correct"
-                print("Correct!")
-            else:
-                verified_result = "Wrong"
-                print("ERRORRRRR")
-                return 
-        elif sat_result == UNSAT:
+        if sat_result == UNSAT:
             if "unsat" in input_cnf:
                 verified_result = "Correct"
                 print("Correct!")
@@ -534,17 +1583,22 @@ def print_and_write_output(sat_result):
                 print("ERRORRRRR")
                 return 
     
-    w = "\nInput file: {}, \nClause: {}, \nVariables: {}, \nTime: {}, \nHeuristic: {}, \nBranches: {}, \nImplication: {}, \nLearned clauses: {}, \nResult: {} ({}), \nAssigmenent: {}\n".format(input_cnf, num_clauses, num_vars, time_taken, heuristic.__name__, branching, implication_count, len(learned_clauses), sat_result, verified_result, output_assignments)
+    stats = solver.stats()
+    w = "\nInput file: {}, \nClause: {}, \nVariables: {}, \nTime: {}, \nHeuristic: {}, \nBranches: {}, \nImplication: {}, \nLearned clauses: {}, \nRestarts: {} ({}), \nResult: {} ({}), \nAssigmenent: {}\n".format(input_cnf, num_clauses, num_vars, stats["time"], stats["heuristic"], stats["branches"], stats["implications"], stats["learned"], stats["restarts"], stats["restart"], sat_result, verified_result, output_assignments)
     print(w)
+    if stats.get("phases") is not None:
+        print("Conflicts: {} ({:.0f}/s), propagations/s: {:.0f}".format(stats["conflicts"], stats["conflicts_per_sec"], stats["propagations_per_sec"]))
+        for phase, (calls, phase_time) in stats["phases"].items():
+            print("  {:<10} {:>10} calls {:>10.3f} s".format(phase, calls, phase_time))
+        print("Learned clause lengths:", stats["learned_histogram"])
 
     output_file = output_path
     if not os.path.exists(output_file):
         os.mkdir(output_file)
-    if is_known_solution:        
-        if verified_result == "Correct":
-            output_file += "correct.txt"
-        else:
-            output_file += "wrong.txt"
+    if verified_result == "Correct":
+        output_file += "correct.txt"
+    elif verified_result == "Wrong":
+        output_file += "wrong.txt"
     else:
         output_file += "solved.txt"
     file1 = open(output_file, "a")  # append mode
@@ -552,25 +1606,112 @@ def print_and_write_output(sat_result):
     file1.close()
     print("result append to file: ", output_file, "\n")
     
+def read_chunks(cnf_file):
+    '''
+    Read the file in chunks that end at a line boundary. Plain files are read through mmap,
+    .gz, .xz/.lzma and .bz2 files are decompressed on the fly.
+    Args:
+        cnf_file (string):
+    Returns:
+        generator of bytes
+    '''
+    extension = os.path.splitext(cnf_file)[1]
+    if extension in compressed_formats:
+        with compressed_formats[extension](cnf_file, 'rb') as f:
+            rest = b""
+            while True:
+                block = f.read(CHUNK_SIZE)
+                if len(block) == 0:
+                    break
+                block = rest + block
+                end = block.rfind(b"\n") + 1
+                rest = block[end:]
+                yield block[:end]
+            yield rest
+        return
+    with open(cnf_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            start = 0
+            while start < len(buffer):
+                end = buffer.find(b"\n", start + CHUNK_SIZE) + 1
+                if end == 0:
+                    end = len(buffer)
+                yield buffer[start:end]
+                start = end
+
+def iter_dimacs(cnf_file):
+    '''
+    Parse a DIMACS cnf file as a stream. Clauses are the literals between two 0s, so a clause
+    can span several lines or share a line with other clauses. Parsing stops at a '%' line,
+    which ends the SATLIB benchmark files.
+    Args:
+        cnf_file (string):
+    Returns:
+        generator: first the header (num_vars, num_clauses), then each clause as [int]
+    '''
+    header_found = False
+    clause = []
+    for chunk in read_chunks(cnf_file):
+        if b"c" in chunk or b"p" in chunk or b"%" in chunk:
+            # slow path: comment, header or end lines in this chunk
+            tokens = []
+            for line in chunk.splitlines():
+                line = line.strip()
+                if len(line) < 1 or line[:1] == b"c":
+                    continue
+                if line[:1] == b"p":
+                    header_found = True
+                    yield int(line.split()[-2]), int(line.split()[-1])
+                elif line[:1] == b"%":
+                    break
+                else:
+                    tokens.extend(line.split())
+            else:
+                line = None
+        else:
+            tokens = chunk.split()
+            line = None
+        if not header_found and len(tokens) > 0:
+            header_found = True
+            yield 0, 0
+        literals = list(map(int, tokens))
+        start = 0
+        while True:
+            try:
+                end = literals.index(0, start)
+            except ValueError:
+                break
+            clause.extend(literals[start:end])
+            yield clause
+            clause = []
+            start = end + 1
+        clause.extend(literals[start:])
+        if line == b"%":
+            break
+    if not header_found:
+        yield 0, 0
+    if len(clause) > 0:
+        yield clause
+
 def read_input(cnf_file):
-    f = open(cnf_file, 'r')
-    Lines = f.readlines()
+    '''
+    Args:
+        cnf_file (string): DIMACS cnf file, optionally compressed
+    Returns:
+        int: num_vars
+        int: num_clauses, as declared in the header
+        [[int]]: clauses, without the literals of variables larger than num_vars
+    '''
+    dimacs = iter_dimacs(cnf_file)
+    num_vars, num_clauses = next(dimacs)
     clauses = []
-    num_vars, num_clauses = 0, 0
-    for line in Lines:
-        line = line.strip()
-        if len(line) < 1:
-            continue
-        if line[0] == 'c':
-            continue
-        if line[0] == 'p':
-            num_vars, num_clauses = int(line.split()[-2]), int(line.split()[-1])
-        else:
-            literals = line.split()[:-1]
-            clause = [int(i) for i in literals if abs(int(i)) > 0 and abs(int(i)) <= num_vars]
-            if len(clause) > 0:
-                clauses.append(clause)  
-                # print(line, clause)
+    for clause in dimacs:
+        if len(clause) > 0 and (max(clause) > num_vars or min(clause) < -num_vars):
+            clause = [literal for literal in clause if abs(literal) <= num_vars]
+        if len(clause) > 0:
+            clauses.append(clause)
     return num_vars, num_clauses, clauses
 
 def get_clauses_set(clauses):
@@ -604,14 +1745,27 @@ def run_from_file(path):
     else:
         is_known_solution = False
     get_read_input()
-    initialize_and_run_solver()
+    if h in ['portfolio', 'cube']:
+        initialize_and_run_parallel(h)
+    else:
+        initialize_and_run_solver()
+
+def is_cnf_file(filename):
+    '''
+    Returns:
+        bool: if the file is a .cnf file, possibly compressed, return True.
+    '''
+    name, extension = os.path.splitext(filename)
+    if extension in compressed_formats:
+        extension = os.path.splitext(name)[1]
+    return extension == '.cnf'
 
 def run_from_dir(path):
     for root, dirs, files in os.walk(path, topdown=False):
         for name in files:
             filename = os.path.join(root, name)
             #  print(os.path.join(root, name), os.path.splitext(filename))
-            if os.path.splitext(filename)[1] == '.cnf':
+            if is_cnf_file(filename):
                 print(filename)
                 if h == 'all':
                     run_experiment(filename, show_result=True)
@@ -628,44 +1782,86 @@ def run_experiment(path, show_result=False):
     # run solver using each heuristic
     for h in heuristics_list:
         if debug: print(h)
-        heuristic = heuristics[h]
-        result = initialize_and_run_solver(show_result=show_result)  # return sat_result, time_taken, branching, implication_count
+        heuristic = h
+        result = initialize_and_run_solver(show_result=show_result)  # return sat_result, time_taken, branching, implication_count, restart_count
         for i in result:
             row.append(i)
         # print(row)
     return row
 
 
-heuristics = {"random": random_heuristic, "two_clause": two_clause_heuristic, "max_freq": max_freq_heuristic, "DLCS": DLCS_heuristic, "VSIDS": vsids_heuristic} #, "VSADS": vsads_heuristic} #"two_clause": two_clause_heuristic, 
+heuristics = {"random": "random_heuristic", "two_clause": "two_clause_heuristic", "max_freq": "max_freq_heuristic", "DLCS": "DLCS_heuristic", "VSIDS": "vsids_heuristic"} #, "VSADS": vsads_heuristic} #"two_clause": two_clause_heuristic, 
 heuristics_list = [h for h in heuristics.keys()]
+local_search_list = ["walksat", "probsat"]  # incomplete solvers of local_search.py, they never answer UNSAT
+phase_modes = ["heuristic", "saved", "target"]
+restart_strategies = {"none": "no_restart", "luby": "luby_restart", "geometric": "geometric_restart", "glucose": "glucose_restart"}
+restart_strategies_list = [r for r in restart_strategies.keys()]
+restart = "luby"
+use_preprocessing = True  # simplify the clauses with preprocess.py before solving
+write_proof = False  # write a binary DRAT proof of each run to result/<cnf name>.<heuristic>.drat, not for portfolio and cube
+debug = False
 timeout_limit = 600 # 10 mins
+VSIDS_DECAY = 0.5 ** (1/256)  # same rate as halving the scores every 256 conflicts
+VSIDS_RESCALE_LIMIT = 1e100
+CLAUSE_DECAY = 0.999
+CLAUSE_RESCALE_LIMIT = 1e20
+GLUE_LBD = 2  # learned clauses with LBD up to this are never deleted
+REDUCE_FIRST = 2000  # conflicts before the first learned clause reduction
+REDUCE_GROWTH = 1.1  # the interval between reductions grows geometrically
+REPHASE_INTERVAL = 1000  # conflicts before the first rephase, the interval grows by as much after each
+REPHASE_ORDER = ["best", "original", "best", "random"]  # phases that rephase() resets the saved phases to, in turn
+LUBY_UNIT = 100  # conflicts per unit of the Luby sequence
+GEOMETRIC_FIRST = 100  # conflicts before the first geometric restart
+GEOMETRIC_GROWTH = 1.5
+GLUCOSE_WINDOW = 50  # number of recent LBDs averaged by the glucose restart
+GLUCOSE_K = 0.8
+PHASES = ["propagate", "analyze", "backtrack", "decide", "reduce", "restart"]  # timed if profile
+PROGRESS_INTERVAL = 10000  # conflicts between progress lines if profile
+LEARNED_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]  # upper ends of the learned clause length histogram
+SOLVER_VERSION = "1.6"  # bump when a change can alter results or stats, stored results of older versions are not reused
 is_known_solution = False
 output_path = "result/"
+compressed_formats = {".gz": gzip.open, ".xz": lzma.open, ".lzma": lzma.open, ".bz2": bz2.open}
+CHUNK_SIZE = 1 << 20  # bytes read at a time by the DIMACS parser
 
 def main():
-    # Usage: python mySATSolver.py [file/folder] [heuristic choice] [debug]
+    # Usage: python mySATSolver.py [file/folder] [heuristic choice] [debug] [restart choice] [proof]
     # Output: appended to ./result.txt
 
-    global debug, heuristics, heuristic, h
-    if len(sys.argv) != 4:
+    global debug, heuristics, heuristic, h, restart, write_proof
+    if len(sys.argv) not in (4, 5, 6):
         print("\nHi, this program will run SAT_Solver on input cnf files (based on input heuristic), then append the result to a text file in 'result/'.")
-        print("\nUsage: (3 input parameters required)")
-        print("    python3 mySATSolver.py <file/dir path> <heuristic choice: {} or 'all'> <allow debug: 0 or 1>".format(heuristics_list))
-        print("\neg: python3 mySATSolver.py CS4244_project/sat/uf20-91/uf20-01.cnf two_clause 0\n")
+        print("\nUsage: (3 input parameters required, restart strategy and proof are optional)")
+        print("    python3 mySATSolver.py <file/dir path> <heuristic choice: {}, {}, 'all', 'portfolio' or 'cube'> <allow debug: 0 or 1> [restart strategy: {}, default 'luby'] [write DRAT proof: 0 or 1]".format(heuristics_list, local_search_list, restart_strategies_list))
+        print("    'all' runs every heuristic one after another, 'portfolio' races them in parallel and keeps the first answer,")
+        print("    'cube' splits the formula into cubes and solves them in parallel.")
+        print("    {} are local search, only for satisfiable formulas: they answer SAT or TIMEOUT.".format(local_search_list))
+        print("\neg: python3 mySATSolver.py CS4244_project/sat/uf20-91/uf20-01.cnf two_clause 0 glucose\n")
         sys.exit()
     
     path = sys.argv[1]
 
     h = sys.argv[2]
     debug = bool(int(sys.argv[3])>0)
-    print("input path: {}, branching heuristic: {}, debug: {}".format(path, h, debug))
+    r = sys.argv[4] if len(sys.argv) >= 5 else "luby"
+    write_proof = len(sys.argv) == 6 and int(sys.argv[5]) > 0
+    print("input path: {}, branching heuristic: {}, debug: {}, restart strategy: {}".format(path, h, debug, r))
+
+    if r not in restart_strategies:
+        print("'{}' is not a valid restart strategy in {}.".format(r, restart_strategies_list))
+        return
+    restart = r
+
+    if write_proof and h in ["portfolio", "cube"]:
+        print("DRAT proofs are not supported in '{}' mode, run a single heuristic or 'all' to write them.".format(h))
+        return
 
-    if h != "all":
-        if h not in heuristics:
-            print("'{}' is not a valid heuristic in {}.".format(h, heuristics_list))
+    if h not in ["all", "portfolio", "cube"]:
+        if h not in heuristics and h not in local_search_list:
+            print("'{}' is not a valid heuristic in {} or {}.".format(h, heuristics_list, local_search_list))
             return
         else:
-            heuristic = heuristics[h]
+            heuristic = h
 
     if os.path.isdir(path):
         run_from_dir(path)
@@ -0,0 +1,209 @@
+import os
+import time
+import multiprocessing as mp
+from queue import Empty
+import mySATSolver
+
+KILL_GRACE = 10  # seconds after the timeout before the members still running are killed
+SHARE_MAX_SIZE = 8  # longest learned clause exported to the other members
+SHARE_MAX_LBD = 3  # learned clauses longer than 2 literals are exported only up to this LBD
+EXCHANGE_SLOTS = 4096  # clauses kept in the ring buffer, older ones are overwritten
+SLOT_SIZE = SHARE_MAX_SIZE + 3  # sender, lbd, size, literals
+
+def get_configs(heuristics=None, seeds=None, restart="luby", local_search="probsat"):
+    '''
+    Args:
+        heuristics ([string]): default all of mySATSolver.heuristics_list
+        seeds ([int]): random seeds raced for each heuristic, default enough seeds to give
+            every cpu one member
+        restart (string): restart strategy of every member
+        local_search (string): algorithm of mySATSolver.local_search_list raced by one more
+            member, None for CDCL members only
+    Returns:
+        [dict]: one {"heuristic", "restart", "seed"} config per portfolio member
+    '''
+    if heuristics is None:
+        heuristics = mySATSolver.heuristics_list
+    if seeds is None:
+        seeds = range(max(1, os.cpu_count() // len(heuristics)))
+    configs = [{"heuristic": h, "restart": restart, "seed": seed} for seed in seeds for h in heuristics]
+    if local_search is not None:
+        configs.append({"heuristic": local_search, "restart": None, "seed": 0})
+    return configs
+
+class ClauseExchange:
+    '''
+    Ring buffer of short or low LBD learned clauses in shared memory, written by every member
+    of a portfolio. Each member reads the clauses of the others at its restarts. A member that
+    falls more than EXCHANGE_SLOTS clauses behind skips the overwritten ones.
+    '''
+
+    def __init__(self, slots=EXCHANGE_SLOTS):
+        '''
+        Create the shared buffer. Must be called before the member processes are started.
+        '''
+        self.slots = slots
+        self.buffer = mp.Array('i', slots * SLOT_SIZE)
+        self.head = mp.Value('q', 0, lock=False)  # clauses written so far, guarded by the buffer lock
+        self.member = -1
+        self.read_position = 0
+
+    def attach(self, member):
+        '''
+        Called in the member process before solving.
+        Args:
+            member (int): index of the member, its own clauses are not imported back
+        '''
+        self.member = member
+        self.read_position = self.head.value
+
+    def export_clause(self, clause, lbd):
+        '''
+        Args:
+            clause ([int]): encoded literals of a learned clause
+            lbd (int):
+        '''
+        if len(clause) > SHARE_MAX_SIZE or (len(clause) > 2 and lbd > SHARE_MAX_LBD):
+            return
+        with self.buffer.get_lock():
+            buffer = self.buffer.get_obj()
+            offset = (self.head.value % self.slots) * SLOT_SIZE
+            buffer[offset:offset + 3 + len(clause)] = [self.member, lbd, len(clause)] + clause
+            self.head.value += 1
+
+    def import_clauses(self):
+        '''
+        Returns:
+            [([int], int)]: the encoded literals and LBD of each clause exported by the other
+                members since the last call
+        '''
+        clauses = []
+        with self.buffer.get_lock():
+            buffer = self.buffer.get_obj()
+            head = self.head.value
+            for position in range(max(self.read_position, head - self.slots), head):
+                offset = (position % self.slots) * SLOT_SIZE
+                sender, lbd, size = buffer[offset:offset + 3]
+                if sender != self.member:
+                    clauses.append((buffer[offset + 3:offset + 3 + size], lbd))
+            self.read_position = head
+        return clauses
+
+def run_member(index, num_vars, clauses, config, timeout, results, exchange=None):
+    '''
+    Member process: solve the clauses with one config and put the answer on the queue.
+    A local search member only answers SAT and does not share clauses.
+    '''
+    if config["heuristic"] in mySATSolver.local_search_list:
+        import local_search
+        solver = local_search.LocalSearchSolver(num_vars, algorithm=config["heuristic"], timeout=timeout, seed=config["seed"])
+        exchange = None
+    else:
+        solver = mySATSolver.CDCLSolver(num_vars, heuristic=config["heuristic"], restart=config["restart"], timeout=timeout, seed=config["seed"])
+    if exchange is not None:
+        exchange.attach(index)
+        solver.exchange = exchange
+    for clause in clauses:
+        solver.add_clause(clause)
+    sat_result = solver.solve()
+    results.put((index, sat_result, solver.model(), solver.stats()))
+
+class Portfolio:
+    '''
+    Race several solver configs on the same clauses, one process each. The first SAT or UNSAT
+    answer wins and the other members are killed. Has the same add_clause/solve/model/stats
+    interface as CDCLSolver.
+    '''
+
+    def __init__(self, num_vars=0, configs=None, restart="luby", timeout=None, share_clauses=True, debug=False):
+        '''
+        Args:
+            num_vars (int):
+            configs ([dict]): member configs, default get_configs(restart=restart)
+            restart (string): restart strategy of the default configs
+            timeout (float): time limit in seconds of each solve call, default timeout_limit
+            share_clauses (bool): exchange short learned clauses between the members
+            debug (bool):
+        '''
+        self.num_vars = num_vars
+        self.clauses = []
+        self.configs = get_configs(restart=restart) if configs is None else configs
+        self.timeout = mySATSolver.timeout_limit if timeout is None else timeout
+        self.share_clauses = share_clauses
+        self.debug = debug
+        self.winner = None  # config of the member that answered the last solve call
+        self.winner_stats = None
+        self.model_values = None
+        self.time_taken = 0
+
+    def add_clause(self, clause):
+        '''
+        Args:
+            clause ([int]): DIMACS literals
+        '''
+        for literal in clause:
+            self.num_vars = max(self.num_vars, abs(literal))
+        self.clauses.append(list(clause))
+
+    def solve(self):
+        '''
+        Returns:
+            string: SAT, UNSAT or TIMEOUT
+        '''
+        start_time = time.time()
+        self.winner = None
+        self.winner_stats = None
+        self.model_values = None
+        sat_result = mySATSolver.TIMEOUT
+        results = mp.Queue()
+        exchange = ClauseExchange() if self.share_clauses and len(self.configs) > 1 else None
+        members = []
+        for index, config in enumerate(self.configs):
+            member = mp.Process(target=run_member, args=(index, self.num_vars, self.clauses, config, self.timeout, results, exchange), daemon=True)
+            member.start()
+            members.append(member)
+        answered = 0
+        try:
+            while answered + sum(member.exitcode not in [None, 0] for member in members) < len(members):
+                try:
+                    index, member_result, model, stats = results.get(timeout=0.1)
+                except Empty:
+                    if time.time() - start_time > self.timeout + KILL_GRACE:
+                        break
+                    continue
+                answered += 1
+                if self.debug: print("member", self.configs[index], member_result, stats["time"])
+                if member_result != mySATSolver.TIMEOUT:
+                    sat_result = member_result
+                    self.winner = self.configs[index]
+                    self.winner_stats = stats
+                    self.model_values = model
+                    break
+        finally:
+            for member in members:
+                member.terminate()
+                member.join()
+        self.time_taken = float("{:.6f}".format(time.time() - start_time))
+        return sat_result
+
+    def model(self):
+        '''
+        Returns:
+            [int]: the DIMACS literals of the winner's model, None if the last solve call was not SAT
+        '''
+        return self.model_values
+
+    def stats(self):
+        '''
+        Returns:
+            dict: the winner's counters, with the portfolio's wall clock time
+        '''
+        if self.winner_stats is None:
+            stats = {"variables": self.num_vars, "clauses": len(self.clauses), "branches": None,
+                     "implications": None, "conflicts": None, "learned": None, "restarts": None, "imported": None,
+                     "heuristic": "portfolio", "restart": None}
+        else:
+            stats = dict(self.winner_stats)
+            stats["heuristic"] = "portfolio: {} (seed {})".format(stats["heuristic"], self.winner["seed"])
+        stats["time"] = self.time_taken
+        return stats
@@ -0,0 +1,499 @@
+import time
+import mySATSolver
+from mySATSolver import CONFLICT, encode_literal, decode_literal
+
+PROBE_LIMIT = 2000  # most variables probed for failed literals
+BVE_MAX_PRODUCT = 64  # variables with more positive * negative occurrences are not eliminated
+BVE_MAX_RESOLVENT = 20  # longest resolvent allowed when eliminating a variable
+
+def strongly_connected_components(graph):
+    '''
+    Tarjan's algorithm, without recursion so that long implication chains do not hit the
+    recursion limit.
+    Args:
+        graph ([[int]]): successors of each node
+    Returns:
+        [[int]]: the nodes of each component, a component comes before the ones that reach it
+    '''
+    index = [-1] * len(graph)
+    low = [0] * len(graph)
+    on_stack = [False] * len(graph)
+    stack = []
+    components = []
+    counter = 0
+    for root in range(len(graph)):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]  # (node, position of the next successor to visit)
+        while len(work) > 0:
+            node, position = work.pop()
+            if position == 0:
+                index[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            elif position > 0:
+                low[node] = min(low[node], low[graph[node][position-1]])
+            while position < len(graph[node]):
+                successor = graph[node][position]
+                position += 1
+                if index[successor] == -1:
+                    work.append((node, position))
+                    work.append((successor, 0))
+                    break
+                if on_stack[successor]:
+                    low[node] = min(low[node], index[successor])
+            else:
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+class Preprocessor:
+    '''
+    Simplify a CNF formula before solving: unit propagation, failed literal probing,
+    equivalent literal substitution, pure literal elimination, subsumption, self-subsuming
+    resolution and bounded variable elimination. Every clause is a set of DIMACS literals, indexed by occurrence lists.
+    Frozen variables, e.g. the variables of later assumptions, are never eliminated.
+    The model of the simplified formula is completed by extend_model().
+    With a proof writer, every derived clause is added to the proof before the clauses it is
+    derived from are deleted, so the proof stays checkable from the input clauses.
+    '''
+
+    def __init__(self, num_vars, clauses, frozen=[], proof=None, timeout=None, debug=False):
+        '''
+        Args:
+            num_vars (int):
+            clauses ([[int]]): DIMACS clauses
+            frozen ([int]): DIMACS literals or variables that must be kept
+            proof (DratWriter): gets the derived and deleted clauses
+            timeout (float): time limit in seconds of run(), the steps left are skipped once it
+                is reached, default no limit
+            debug (bool):
+        '''
+        self.num_vars = num_vars
+        for clause in clauses:
+            for literal in clause:
+                self.num_vars = max(self.num_vars, abs(literal))
+        self.clauses = []  # sets of DIMACS literals, None once deleted
+        self.occurs = [set() for x in range(2*self.num_vars+2)]  # clause ids of each encoded literal
+        self.assignments = [-1] * (self.num_vars+1)  # values fixed at level 0
+        self.frozen = set(abs(literal) for literal in frozen)
+        self.units = []  # assigned literals that are not propagated yet
+        self.eliminated = []  # (variable, its clauses) in the order of elimination
+        self.subsume_queue = []  # clause ids to check for subsumption
+        self.ok = True  # False once the formula is UNSAT
+        self.proof = proof
+        self.timeout = timeout
+        self.deadline = None  # time.time() at which run() stops simplifying
+        self.debug = debug
+
+        self.input_clauses = 0
+        self.fixed_count = 0
+        self.failed_count = 0
+        self.subsumed_count = 0
+        self.strengthened_count = 0
+        self.equivalent_count = 0
+        self.time_taken = 0
+
+        for clause in clauses:
+            self.input_clauses += 1
+            self.add_clause(clause)
+
+    def out_of_time(self):
+        return self.deadline is not None and time.time() > self.deadline
+
+    def get_literal_value(self, literal):
+        '''
+        Returns:
+            int: 1 if the DIMACS literal is true, 0 if false, -1 if unassigned
+        '''
+        value = self.assignments[abs(literal)]
+        if value == -1:
+            return -1
+        return value if literal > 0 else 1 - value
+
+    def add_clause(self, clause, derived=False):
+        '''
+        Add a clause, simplified with the fixed values.
+        Args:
+            clause ([int]): DIMACS literals
+            derived (bool): the clause is not an input clause, but implied by them
+        '''
+        literals = set()
+        shortened = False
+        for literal in clause:
+            value = self.get_literal_value(literal)
+            if value == 1 or -literal in literals:
+                return  # satisfied or tautology
+            if value == -1:
+                literals.add(literal)
+            else:
+                shortened = True
+        if self.proof is not None and (derived or shortened):
+            self.proof.add([encode_literal(literal) for literal in literals])
+        if len(literals) == 0:
+            self.ok = False
+        elif len(literals) == 1:
+            self.assign(literals.pop())
+        else:
+            clause_id = len(self.clauses)
+            self.clauses.append(literals)
+            for literal in literals:
+                self.occurs[encode_literal(literal)].add(clause_id)
+            self.subsume_queue.append(clause_id)
+
+    def delete_clause(self, clause_id, log=True):
+        if self.proof is not None and log:
+            self.proof.delete([encode_literal(literal) for literal in self.clauses[clause_id]])
+        for literal in self.clauses[clause_id]:
+            self.occurs[encode_literal(literal)].discard(clause_id)
+        self.clauses[clause_id] = None
+
+    def strengthen(self, clause_id, literal):
+        '''
+        Remove a literal from the clause, and assign the last literal if it becomes unit.
+        '''
+        clause = self.clauses[clause_id]
+        if self.proof is not None:
+            self.proof.add([encode_literal(x) for x in clause if x != literal])
+            self.proof.delete([encode_literal(x) for x in clause])
+        clause.discard(literal)
+        self.occurs[encode_literal(literal)].discard(clause_id)
+        if len(clause) == 1:
+            unit = next(iter(clause))
+            self.delete_clause(clause_id, log=False)  # unit clauses stay in the proof
+            if self.get_literal_value(unit) == 0:
+                self.ok = False
+            elif self.get_literal_value(unit) == -1:
+                self.assign(unit)
+        else:
+            self.subsume_queue.append(clause_id)
+
+    def assign(self, literal):
+        self.assignments[abs(literal)] = 1 if literal > 0 else 0
+        self.units.append(literal)
+        self.fixed_count += 1
+
+    def propagate(self):
+        '''
+        Delete the clauses satisfied by the fixed values and remove the false literals.
+        Returns:
+            bool: False on conflict
+        '''
+        while self.ok and len(self.units) > 0:
+            literal = self.units.pop()
+            for clause_id in list(self.occurs[encode_literal(literal)]):
+                self.delete_clause(clause_id)
+            for clause_id in list(self.occurs[encode_literal(-literal)]):
+                if self.clauses[clause_id] != None:
+                    self.strengthen(clause_id, -literal)
+                if not self.ok:
+                    break
+        return self.ok
+
+    def probe(self):
+        '''
+        Failed literal probing: assign each literal of the variables in binary clauses and
+        propagate. If one literal conflicts its negation is fixed, and the literals implied
+        by both literals of a variable are fixed too.
+        '''
+        candidates = {}
+        for clause in self.clauses:
+            if clause != None and len(clause) == 2:
+                for literal in clause:
+                    candidates[abs(literal)] = candidates.get(abs(literal), 0) + 1
+        if len(candidates) == 0:
+            return
+        solver = mySATSolver.CDCLSolver(self.num_vars, heuristic="max_freq")
+        for clause in self.clauses:
+            if clause != None:
+                solver.add_clause(list(clause))
+        if solver.unit_propagation() == CONFLICT:
+            self.ok = False
+            return
+        for var in sorted(candidates, key=candidates.get, reverse=True)[:PROBE_LIMIT]:
+            if self.out_of_time():
+                break
+            if solver.assignments[var] != -1:
+                continue
+            implied = []
+            for literal in [2*var, 2*var+1]:
+                solver.assign_decision_var(literal)
+                if solver.unit_propagation() == CONFLICT:
+                    implied.append(None)
+                else:
+                    implied.append(set(solver.trail[solver.trail_lim[0]+1:]))
+                solver.backtrack(0)
+            if implied[0] is None and implied[1] is None:
+                if self.proof is not None:
+                    self.proof.add([2*var+1])
+                self.ok = False
+                return
+            if implied[0] is None:
+                fixed = [2*var+1]
+                self.failed_count += 1
+            elif implied[1] is None:
+                fixed = [2*var]
+                self.failed_count += 1
+            else:
+                fixed = list(implied[0] & implied[1])
+            for literal in fixed:
+                if self.proof is not None:
+                    if literal >> 1 != var:
+                        # implied by both sides: first the two implications, then the unit
+                        self.proof.add([2*var+1, literal])
+                        self.proof.add([2*var, literal])
+                    self.proof.add([literal])
+                literal = decode_literal(literal)
+                if self.get_literal_value(literal) == -1:
+                    self.assign(literal)
+                solver.add_clause([literal])
+            if len(fixed) > 0 and solver.unit_propagation() == CONFLICT:
+                self.ok = False
+                return
+        self.propagate()
+
+    def substitute_equivalent_literals(self):
+        '''
+        The literals of a strongly connected component of the binary implication graph are
+        all equivalent. Each one is replaced by a representative of the component in every
+        clause, a frozen variable if there is one, and its variable is eliminated. A component
+        with both literals of a variable makes the formula UNSAT. Repeated until no component
+        is left, since the substitution can make new binary clauses.
+        '''
+        while self.ok and not self.out_of_time():
+            graph = [[] for x in range(2*self.num_vars+2)]  # implications between encoded literals
+            for clause in self.clauses:
+                if clause != None and len(clause) == 2:
+                    a, b = [encode_literal(literal) for literal in clause]
+                    graph[a ^ 1].append(b)
+                    graph[b ^ 1].append(a)
+            replace = {}  # DIMACS literal: its representative
+            for component in strongly_connected_components(graph):
+                if len(component) < 2 or decode_literal(component[0]) in replace:
+                    continue
+                variables = set(literal >> 1 for literal in component)
+                if len(variables) < len(component):
+                    # x and -x imply each other
+                    literal = next(literal for literal in component if literal ^ 1 in component)
+                    if self.proof is not None:
+                        self.proof.add([literal])
+                    self.ok = False
+                    return
+                representative = decode_literal(min(component, key=lambda literal: (literal >> 1 not in self.frozen, literal >> 1)))
+                for literal in component:
+                    literal = decode_literal(literal)
+                    if abs(literal) != abs(representative) and abs(literal) not in self.frozen:
+                        replace[literal] = representative
+                        replace[-literal] = -representative
+            if len(replace) == 0:
+                return
+            clause_ids = set()
+            for literal in replace:
+                clause_ids |= self.occurs[encode_literal(literal)]
+            substituted = [[replace.get(literal, literal) for literal in self.clauses[clause_id]] for clause_id in clause_ids]
+            for literal, representative in replace.items():
+                if literal > 0:
+                    self.eliminated.append((literal, [[literal, -representative], [-literal, representative]]))
+                    self.equivalent_count += 1
+            # the new clauses follow from the old ones while the equivalences are still there
+            for clause in substituted:
+                self.add_clause(clause, derived=True)
+            for clause_id in clause_ids:
+                self.delete_clause(clause_id)
+            if not self.ok or not self.propagate():
+                return
+
+    def eliminate_pure_literals(self):
+        '''
+        A variable that occurs with one sign only is eliminated with all of its clauses.
+        '''
+        changed = True
+        while changed:
+            changed = False
+            for var in range(1, self.num_vars+1):
+                if var in self.frozen or self.assignments[var] != -1:
+                    continue
+                positive, negative = self.occurs[2*var], self.occurs[2*var+1]
+                if (len(positive) == 0) == (len(negative) == 0):
+                    continue
+                clause_ids = list(positive) + list(negative)
+                self.eliminated.append((var, [list(self.clauses[clause_id]) for clause_id in clause_ids]))
+                for clause_id in clause_ids:
+                    self.delete_clause(clause_id)
+                changed = True
+
+    def subsume(self):
+        '''
+        Delete the clauses subsumed by the queued clauses, and remove a literal -l from
+        every clause D such that the queued clause C contains l and C - {l} is a subset of D.
+        '''
+        queue = sorted(set(self.subsume_queue), key=lambda clause_id: len(self.clauses[clause_id] or ()))
+        self.subsume_queue = []
+        while self.ok and len(queue) > 0 and not self.out_of_time():
+            for clause_id in queue:
+                clause = self.clauses[clause_id]
+                if clause == None:
+                    continue
+                literal = min(clause, key=lambda literal: len(self.occurs[encode_literal(literal)]))
+                for other_id in list(self.occurs[encode_literal(literal)]):
+                    other = self.clauses[other_id]
+                    if other_id != clause_id and len(other) >= len(clause) and clause <= other:
+                        self.delete_clause(other_id)
+                        self.subsumed_count += 1
+                for literal in list(clause):
+                    for other_id in list(self.occurs[encode_literal(-literal)]):
+                        other = self.clauses[other_id]
+                        if other == None or len(other) < len(clause):
+                            continue
+                        if all(x == literal or x in other for x in clause):
+                            self.strengthen(other_id, -literal)
+                            self.strengthened_count += 1
+                            if not self.ok:
+                                return
+                    if self.clauses[clause_id] == None:
+                        break
+                if not self.propagate():
+                    return
+            queue = sorted(set(clause_id for clause_id in self.subsume_queue if self.clauses[clause_id] != None), key=lambda clause_id: len(self.clauses[clause_id]))
+            self.subsume_queue = []
+
+    def resolvents(self, var):
+        '''
+        Returns:
+            [set]: the non-tautological resolvents on var, None if eliminating var would add
+                more clauses than it removes or a resolvent longer than BVE_MAX_RESOLVENT
+        '''
+        positive = [self.clauses[clause_id] for clause_id in self.occurs[2*var]]
+        negative = [self.clauses[clause_id] for clause_id in self.occurs[2*var+1]]
+        resolvents = []
+        for p in positive:
+            for n in negative:
+                resolvent = (p | n) - {var, -var}
+                if any(-literal in resolvent for literal in resolvent):
+                    continue
+                if len(resolvent) > BVE_MAX_RESOLVENT:
+                    return None
+                resolvents.append(resolvent)
+                if len(resolvents) > len(positive) + len(negative):
+                    return None
+        return resolvents
+
+    def eliminate_variables(self):
+        '''
+        Bounded variable elimination: replace the clauses of a variable by all of their
+        resolvents on it, if that does not increase the number of clauses.
+        '''
+        changed = True
+        while changed and self.ok and not self.out_of_time():
+            changed = False
+            candidates = [var for var in range(1, self.num_vars+1) if var not in self.frozen and self.assignments[var] == -1
+                          and 0 < len(self.occurs[2*var]) * len(self.occurs[2*var+1]) <= BVE_MAX_PRODUCT]
+            candidates.sort(key=lambda var: len(self.occurs[2*var]) * len(self.occurs[2*var+1]))
+            for var in candidates:
+                if self.out_of_time():
+                    break
+                if self.assignments[var] != -1 or len(self.occurs[2*var]) * len(self.occurs[2*var+1]) > BVE_MAX_PRODUCT:
+                    continue
+                resolvents = self.resolvents(var)
+                if resolvents == None:
+                    continue
+                clause_ids = list(self.occurs[2*var]) + list(self.occurs[2*var+1])
+                self.eliminated.append((var, [list(self.clauses[clause_id]) for clause_id in clause_ids]))
+                for resolvent in resolvents:
+                    self.add_clause(resolvent, derived=True)
+                for clause_id in clause_ids:
+                    self.delete_clause(clause_id)
+                if not self.ok or not self.propagate():
+                    return
+                changed = True
+            self.subsume()
+
+    def run(self):
+        '''
+        Returns:
+            bool: False if the formula is found UNSAT.
+        '''
+        start_time = time.time()
+        if self.timeout is not None:
+            self.deadline = start_time + self.timeout
+        # unit propagation always runs, the other steps are skipped once the time is up
+        if self.ok: self.propagate()
+        for step in [self.probe, self.substitute_equivalent_literals, self.eliminate_pure_literals,
+                     self.subsume, self.eliminate_variables, self.eliminate_pure_literals]:
+            if self.ok and not self.out_of_time():
+                step()
+        self.time_taken = float("{:.6f}".format(time.time() - start_time))
+        if self.debug: print("preprocess:", self.stats())
+        return self.ok
+
+    def check_frozen(self, literals):
+        '''
+        A variable of the input that is not frozen may have been fixed, substituted or
+        eliminated, so the simplified clauses give wrong answers for a later clause or
+        assumption on it. Variables created after the preprocessing are fine.
+        Args:
+            literals ([int]): DIMACS literals of a new clause or of assumptions
+        '''
+        for literal in literals:
+            var = abs(literal)
+            if var <= self.num_vars and var not in self.frozen:
+                raise ValueError("Variable {} is not frozen in the preprocessing, pass it in frozen to new_solver() to use it in a later clause or assumption.".format(var))
+
+    def get_clauses(self):
+        '''
+        Returns:
+            [[int]]: the simplified clauses, with unit clauses for the fixed frozen variables.
+                [[]] if the formula is UNSAT.
+        '''
+        if not self.ok:
+            return [[]]
+        clauses = [sorted(clause, key=abs) for clause in self.clauses if clause != None]
+        for var in self.frozen:
+            if var <= self.num_vars and self.assignments[var] != -1:
+                clauses.append([var if self.assignments[var] == 1 else -var])
+        return clauses
+
+    def extend_model(self, model):
+        '''
+        Args:
+            model ([int]): DIMACS literals of a model of the simplified clauses
+        Returns:
+            [int]: DIMACS literals of a model of the input clauses, then the literals of the
+                variables created after the preprocessing, None if model is None
+        '''
+        if model == None:
+            return None
+        values = [0] * (self.num_vars+1)
+        for literal in model:
+            if abs(literal) <= self.num_vars:
+                values[abs(literal)] = 1 if literal > 0 else 0
+        for var in range(1, self.num_vars+1):
+            if self.assignments[var] != -1:
+                values[var] = self.assignments[var]
+        for var, clauses in reversed(self.eliminated):
+            values[var] = 0
+            for clause in clauses:
+                if var in clause and not any(values[abs(x)] == (1 if x > 0 else 0) for x in clause if x != var):
+                    values[var] = 1
+                    break
+        extended = [var if values[var] == 1 else -var for var in range(1, self.num_vars+1)]
+        return extended + [literal for literal in model if abs(literal) > self.num_vars]
+
+    def stats(self):
+        '''
+        Returns:
+            dict: size of the formula before and after, and what was removed
+        '''
+        return {"clauses_before": self.input_clauses,
+                "clauses_after": sum(clause != None for clause in self.clauses),
+                "fixed": self.fixed_count, "failed_literals": self.failed_count,
+                "eliminated": len(self.eliminated), "equivalent": self.equivalent_count, "subsumed": self.subsumed_count,
+                "strengthened": self.strengthened_count, "time": self.time_taken}
@@ -0,0 +1,84 @@
+PROOF_BUFFER_SIZE = 1 << 16  # bytes buffered before a write to the proof file
+
+class DratWriter:
+    '''
+    Write a DRAT proof in the binary format: each line is 'a' (added clause) or 'd' (deleted
+    clause), then the literals as variable-length integers of 2*var + (1 if negative), then 0.
+    This is the same encoding as the literals inside CDCLSolver, so they are written as is.
+    The lines are collected in a buffer and written in blocks, so proof logging costs little.
+    '''
+
+    def __init__(self, path):
+        '''
+        Args:
+            path (string): proof file, overwritten
+        '''
+        self.path = path
+        self.file = open(path, 'wb')
+        self.buffer = bytearray()
+        self.added_count = 0
+        self.deleted_count = 0
+
+    def write_line(self, tag, literals):
+        buffer = self.buffer
+        buffer.append(tag)
+        for literal in literals:
+            while literal > 127:
+                buffer.append((literal & 127) | 128)
+                literal >>= 7
+            buffer.append(literal)
+        buffer.append(0)
+        if len(buffer) >= PROOF_BUFFER_SIZE:
+            self.flush()
+
+    def add(self, literals):
+        '''
+        Args:
+            literals ([int]): encoded literals of a clause implied by the formula
+        '''
+        self.added_count += 1
+        self.write_line(97, literals)  # 'a'
+
+    def delete(self, literals):
+        '''
+        Args:
+            literals ([int]): encoded literals of a clause that is no longer used
+        '''
+        self.deleted_count += 1
+        self.write_line(100, literals)  # 'd'
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.buffer = bytearray()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+def read_drat(path):
+    '''
+    Read a binary DRAT proof back, for checking.
+    Returns:
+        [(string, [int])]: ('a' or 'd', DIMACS literals) of each line
+    '''
+    lines = []
+    data = open(path, 'rb').read()
+    index = 0
+    while index < len(data):
+        tag = chr(data[index])
+        index += 1
+        literals = []
+        while True:
+            literal, shift = 0, 0
+            while True:
+                byte = data[index]
+                index += 1
+                literal |= (byte & 127) << shift
+                shift += 7
+                if byte < 128:
+                    break
+            if literal == 0:
+                break
+            literals.append(literal >> 1 if literal & 1 == 0 else -(literal >> 1))
+        lines.append((tag, literals))
+    return lines
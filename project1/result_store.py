@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import hashlib
+import mySATSolver
+
+DEFAULT_DB = "result/results.db"
+COLUMN_TYPES = {'variables': 'INTEGER', 'clauses': 'INTEGER', 'result': 'TEXT', 'time': 'REAL',
+    'branches': 'INTEGER', 'implications': 'INTEGER', 'restarts': 'INTEGER',
+    'conflicts': 'INTEGER', 'conflicts_per_sec': 'REAL', 'propagations_per_sec': 'REAL'}
+for phase in mySATSolver.PHASES:
+    COLUMN_TYPES['time_' + phase] = 'REAL'
+COLUMN_TYPES['learned_histogram'] = 'TEXT'
+RESULT_COLUMNS = list(COLUMN_TYPES)
+
+def hash_cnf(cnf_file):
+    '''
+    Args:
+        cnf_file (string): DIMACS cnf file, optionally compressed
+    Returns:
+        string: sha256 of the (decompressed) file content, the same for a file and its .gz copy
+    '''
+    digest = hashlib.sha256()
+    for chunk in mySATSolver.read_chunks(cnf_file):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+class ResultStore:
+    '''
+    Persistent store of benchmark results in an SQLite file. A result is keyed by the hash of
+    the cnf content, the solver version, the heuristic and the rest of the solver config, so
+    a sweep can skip every job that is already done and resume after a crash. Each result is
+    committed as soon as it is put.
+    '''
+
+    def __init__(self, path=DEFAULT_DB):
+        '''
+        Args:
+            path (string): SQLite file, created with its directory if it does not exist
+        '''
+        directory = os.path.dirname(path)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS results (
+            cnf_hash TEXT, solver_version TEXT, heuristic TEXT, config TEXT, filename TEXT, '''
+            + ', '.join(column + ' ' + COLUMN_TYPES[column] for column in RESULT_COLUMNS) + ''',
+            PRIMARY KEY (cnf_hash, solver_version, heuristic, config))''')
+        # stores created before a column was added get it as NULL for their old results
+        existing = [row[1] for row in self.db.execute('PRAGMA table_info(results)')]
+        for column in RESULT_COLUMNS:
+            if column not in existing:
+                self.db.execute('ALTER TABLE results ADD COLUMN ' + column + ' ' + COLUMN_TYPES[column])
+        self.db.commit()
+
+    def get(self, cnf_hash, solver_version, heuristic, config):
+        '''
+        Returns:
+            dict: the stored result columns (RESULT_COLUMNS), or None if the job has not been run
+        '''
+        row = self.db.execute('SELECT ' + ', '.join(RESULT_COLUMNS) + ''' FROM results
+            WHERE cnf_hash = ? AND solver_version = ? AND heuristic = ? AND config = ?''',
+            (cnf_hash, solver_version, heuristic, config)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(RESULT_COLUMNS, row))
+
+    def put(self, cnf_hash, solver_version, heuristic, config, filename, result):
+        '''
+        Args:
+            filename (string): name of the cnf file, kept for the csv export
+            result (dict): result columns (RESULT_COLUMNS), missing ones are stored as NULL
+        '''
+        values = [result.get(column) for column in RESULT_COLUMNS]
+        self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ' + ', '.join('?' * len(RESULT_COLUMNS)) + ')',
+            [cnf_hash, solver_version, heuristic, config, filename] + values)
+        self.db.commit()
+
+    def get_all(self, solver_version, config):
+        '''
+        Returns:
+            dict: {cnf_hash: (filename, {heuristic: result dict})} of every result of this solver
+                version and config
+        '''
+        all_results = {}
+        rows = self.db.execute('SELECT cnf_hash, heuristic, filename, ' + ', '.join(RESULT_COLUMNS) + ''' FROM results
+            WHERE solver_version = ? AND config = ? ORDER BY filename''', (solver_version, config))
+        for row in rows:
+            cnf_hash, heuristic, filename = row[:3]
+            if cnf_hash not in all_results:
+                all_results[cnf_hash] = (filename, {})
+            all_results[cnf_hash][1][heuristic] = dict(zip(RESULT_COLUMNS, row[3:]))
+        return all_results
+
+    def close(self):
+        self.db.close()